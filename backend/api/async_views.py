@@ -0,0 +1,115 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .cache import patch_conditional_headers, response_cache
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+def cached_response(request, basename, models):
+    """Ответ из кэша или 304 по ETag; None, если нужен полный ответ."""
+    drf_request = Request(request)
+    etag = response_cache.make_etag(drf_request, models, (), 'json')
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        data = response_cache.get(
+            response_cache.make_key(drf_request, basename, models),
+            record_miss=False,
+        )
+        if data is None:
+            return None
+        response = HttpResponse(
+            JSONRenderer().render(data),
+            content_type='application/json',
+        )
+        response['X-Cache'] = 'HIT'
+    elif response.status_code != 304:
+        return None
+    return patch_conditional_headers(response, etag)
+
+
+def render_response(view, request, *args, **kwargs):
+    """Выполняет синхронное представление DRF и дочитывает ответ.
+
+    В Django 3.2 ASGI-обработчик перебирает потоковый ответ прямо
+    в цикле событий, где обращения к базе запрещены, поэтому
+    генератор с запросами к базе дочитывается здесь, в потоке.
+    """
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    if not response.streaming:
+        return response
+    materialized = HttpResponse(
+        b''.join(response.streaming_content),
+        status=response.status_code,
+    )
+    for header, value in response.items():
+        materialized[header] = value
+    return materialized
+
+
+def async_view(view, basename=None, models=()):
+    """Асинхронная обёртка над представлением DRF.
+
+    Попадания в кэш ответов и совпадения ETag для анонимных
+    GET-запросов отдаются без перехода в поток. Остальные запросы
+    выполняет исходное представление через sync_to_async: в Django 3.2 нет
+    асинхронного ORM, и все запросы к базе остаются синхронными.
+    """
+    async def wrapper(request, *args, **kwargs):
+        if (
+            basename is not None
+            and request.method in READ_METHODS
+            and 'HTTP_AUTHORIZATION' not in request.META
+            and 'text/html' not in request.META.get('HTTP_ACCEPT', '')
+            and (
+                'HTTP_IF_NONE_MATCH' in request.META
+                or 'HTTP_IF_MODIFIED_SINCE' not in request.META
+            )
+        ):
+            response = await sync_to_async(
+                cached_response, thread_sensitive=False
+            )(request, basename, models)
+            if response is not None:
+                return response
+        return await sync_to_async(render_response)(
+            view, request, *args, **kwargs
+        )
+    return wrapper
+
+
+tag_list = async_view(
+    TagViewSet.as_view({'get': 'list'}, basename='tag'),
+    'tag',
+    TagViewSet.cache_models,
+)
+ingredient_list = async_view(
+    IngredientViewSet.as_view({'get': 'list'}, basename='ingredient'),
+    'ingredient',
+    IngredientViewSet.cache_models,
+)
+recipe_detail = async_view(
+    RecipeViewSet.as_view(
+        {
+            'get': 'retrieve',
+            'put': 'update',
+            'patch': 'partial_update',
+            'delete': 'destroy',
+        },
+        basename='recipe',
+    ),
+    'recipe',
+    RecipeViewSet.cache_models,
+)
+download_shopping_cart = async_view(
+    RecipeViewSet.as_view(
+        {'get': 'download_shopping_cart'},
+        basename='recipe',
+        **RecipeViewSet.download_shopping_cart.kwargs
+    ),
+)
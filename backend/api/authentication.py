@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+SHARED_KEY = 'auth-token:{}'
+
+
+class TokenCache:
+    """LRU-кэш «токен -> пользователь» в памяти процесса с TTL.
+
+    При AUTH_TOKEN_CACHE_ALIAS пользователи также сохраняются в общем
+    кэше. Сброс записи виден другим процессам только после истечения
+    их локального TTL.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def shared(self):
+        alias = settings.AUTH_TOKEN_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                user, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    return user
+                del self._entries[key]
+        if self.shared is None:
+            return None
+        user = self.shared.get(SHARED_KEY.format(key))
+        if user is not None:
+            self.__remember__(key, user)
+        return user
+
+    def set(self, key, user):
+        self.__remember__(key, user)
+        if self.shared is not None:
+            self.shared.set(
+                SHARED_KEY.format(key),
+                user,
+                timeout=settings.AUTH_TOKEN_CACHE_TTL,
+            )
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete_many([SHARED_KEY.format(key) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __remember__(self, key, user):
+        size = settings.AUTH_TOKEN_CACHE_SIZE
+        if not size:
+            return
+        expires = time.monotonic() + settings.AUTH_TOKEN_CACHE_TTL
+        with self._lock:
+            self._entries[key] = (user, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к базе для известных токенов."""
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+            return user, token
+        return user, self.get_model()(key=key, user=user)
@@ -0,0 +1,237 @@
+import time
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers
+)
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+VERSION_KEY = 'response-cache:version:{}'
+RESPONSE_KEY = 'response-cache:{}:{}'
+STATS_KEY = 'response-cache:stats:{}'
+USER_SCOPE = 'user:{}'
+COUNTERS_SCOPE = 'recipe:counters'
+TRENDING_SCOPE = 'recipe:trending'
+
+
+class ResponseCache:
+    """Кэш ответов API с версиями моделей вместо TTL.
+
+    Ключ ответа включает версии всех моделей, от которых он зависит,
+    поэтому изменение модели сразу делает старые записи недостижимыми.
+    """
+
+    @property
+    def backend(self):
+        return caches[settings.RESPONSE_CACHE_ALIAS]
+
+    @staticmethod
+    def __model_key__(model):
+        return VERSION_KEY.format(model._meta.label_lower)
+
+    def get_versions(self, models, scopes=()):
+        keys = [self.__model_key__(model) for model in models] + [
+            VERSION_KEY.format(scope) for scope in scopes
+        ]
+        versions = self.backend.get_many(keys)
+        missing = {
+            key: time.time_ns() for key in keys if key not in versions
+        }
+        for key, version in missing.items():
+            self.backend.add(key, version, timeout=None)
+        if missing:
+            versions.update(self.backend.get_many(missing.keys()))
+        return [versions.get(key, 0) for key in keys]
+
+    def bump(self, model):
+        self.bump_scope(model._meta.label_lower)
+
+    def bump_scope(self, scope):
+        """Сдвигает версию произвольной области, например пользователя."""
+        key = VERSION_KEY.format(scope)
+        try:
+            self.backend.incr(key)
+        except ValueError:
+            self.backend.set(key, time.time_ns(), timeout=None)
+
+    @staticmethod
+    def epoch():
+        """Номер окна длиной RESPONSE_CACHE_TIMEOUT.
+
+        Входит в ключи и ETag, чтобы данные, меняющиеся без сдвига
+        версий (счётчики избранного), отставали не дольше окна.
+        """
+        return int(time.time()) // settings.RESPONSE_CACHE_TIMEOUT
+
+    def __digest__(self, request, models, scopes=(), *extra):
+        params = sorted(
+            (name, sorted(values))
+            for name, values in request.query_params.lists()
+        )
+        raw = repr((
+            request.build_absolute_uri(request.path),
+            params,
+            self.get_versions(models, scopes),
+            self.epoch(),
+            *extra,
+        ))
+        return md5(raw.encode()).hexdigest()
+
+    def make_key(self, request, resource, models, scopes=()):
+        return RESPONSE_KEY.format(
+            resource, self.__digest__(request, models, scopes)
+        )
+
+    def make_etag(self, request, models, scopes=(), representation=''):
+        """ETag из версий моделей, не требующий запросов к базе."""
+        return '"{}"'.format(
+            self.__digest__(request, models, scopes, representation)
+        )
+
+    def get(self, key, record_miss=True):
+        data = self.backend.get(key)
+        if data is None and not record_miss:
+            return None
+        self.backend.add(STATS_KEY.format('hits'), 0, timeout=None)
+        self.backend.add(STATS_KEY.format('misses'), 0, timeout=None)
+        self.backend.incr(
+            STATS_KEY.format('misses' if data is None else 'hits')
+        )
+        return data
+
+    def set(self, key, data):
+        self.backend.set(key, data, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+
+    def stats(self):
+        stats = self.backend.get_many(
+            (STATS_KEY.format('hits'), STATS_KEY.format('misses'))
+        )
+        return {
+            'hits': stats.get(STATS_KEY.format('hits'), 0),
+            'misses': stats.get(STATS_KEY.format('misses'), 0),
+        }
+
+
+response_cache = ResponseCache()
+
+
+class VersionedCacheMixin:
+    """Кэширует list/retrieve для анонимных пользователей.
+
+    cache_models перечисляет модели, от которых зависит ответ,
+    get_cache_scopes() — дополнительные области версий запроса.
+    """
+
+    cache_models = ()
+
+    def get_cache_scopes(self):
+        return ()
+
+    def list(self, request, *args, **kwargs):
+        return self.__cached_response__(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.__cached_response__(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def __cached_response__(self, handler, request, *args, **kwargs):
+        if not request.user.is_anonymous:
+            return handler(request, *args, **kwargs)
+        key = response_cache.make_key(
+            request, self.basename, self.cache_models,
+            self.get_cache_scopes(),
+        )
+        data = response_cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+def patch_conditional_headers(response, etag, last_modified=None,
+                              anonymous=True):
+    """Проставляет валидаторы и Cache-Control для nginx и клиентов.
+
+    Анонимные ответы можно хранить в общем кэше max-age секунд,
+    ответы с авторизацией — только у клиента и с перепроверкой.
+    """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    if anonymous:
+        patch_cache_control(
+            response, public=True, max_age=settings.HTTP_CACHE_MAX_AGE
+        )
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+class ConditionalResponseMixin:
+    """Отвечает 304 Not Modified на условные list/retrieve.
+
+    ETag собирается из версий cache_models и версии пользователя,
+    поэтому неизменённые данные не читаются и не сериализуются.
+    counter_scopes добавляются в ETag только авторизованных ответов:
+    анонимные ответы берутся из кэша, где счётчики могут отставать.
+    """
+
+    cache_models = ()
+    counter_scopes = ()
+
+    def get_cache_scopes(self):
+        return ()
+
+    def list(self, request, *args, **kwargs):
+        return self.__conditional_response__(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.__conditional_response__(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_last_modified(self, request, *args, **kwargs):
+        """Время изменения ресурса в секундах или None."""
+        return None
+
+    def __conditional_response__(self, handler, request, *args, **kwargs):
+        anonymous = request.user.is_anonymous
+        etag = response_cache.make_etag(
+            request,
+            self.cache_models,
+            self.get_cache_scopes() if anonymous else (
+                *self.get_cache_scopes(),
+                USER_SCOPE.format(request.user.pk),
+                *self.counter_scopes,
+            ),
+            request.accepted_renderer.format,
+        )
+        last_modified = self.get_last_modified(request, *args, **kwargs)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        elif response.status_code != 304:
+            return response
+        return patch_conditional_headers(
+            response, etag, last_modified, anonymous
+        )
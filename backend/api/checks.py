@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+LOCAL_CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def local_cache_aliases():
+    """Алиасы версионных кэшей, которые живут только внутри процесса.
+
+    Версии моделей, индекса ингредиентов и токены сбрасываются
+    в одном процессе и должны быть видны остальным воркерам,
+    обработчику задач, командам загрузки и пересчёту трендов.
+    """
+    aliases = {settings.RESPONSE_CACHE_ALIAS, settings.INDEX_CACHE_ALIAS}
+    if settings.AUTH_TOKEN_CACHE_ALIAS:
+        aliases.add(settings.AUTH_TOKEN_CACHE_ALIAS)
+    return sorted(
+        alias for alias in aliases
+        if settings.CACHES[alias]['BACKEND'] == LOCAL_CACHE_BACKEND
+    )
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    return [
+        Warning(
+            f'Кэш {alias!r} использует LocMemCache: сброс версий '
+            'не дойдёт до других процессов.',
+            hint='Задайте CACHE_BACKEND и CACHE_LOCATION общего кэша '
+                 '(memcached, DatabaseCache).',
+            id='api.W001',
+        )
+        for alias in local_cache_aliases()
+    ]
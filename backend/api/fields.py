@@ -0,0 +1,17 @@
+from django.conf import settings
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework.exceptions import ValidationError
+
+
+class LimitedBase64ImageField(Base64ImageField):
+    """Base64-изображение, размер которого проверяется до декодирования."""
+
+    def to_internal_value(self, base64_data):
+        if isinstance(base64_data, str):
+            payload = base64_data.partition(';base64,')[2] or base64_data
+            if len(payload) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+                raise ValidationError(
+                    'Размер изображения не должен превышать '
+                    f'{settings.RECIPE_IMAGE_MAX_SIZE // 1024 ** 2} МБ'
+                )
+        return super().to_internal_value(base64_data)
@@ -0,0 +1,435 @@
+import base64
+import json
+import statistics
+import time
+from io import BytesIO
+from secrets import token_hex
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from recipes.images import delete_variants
+from recipes.models import Ingredient, Recipe, Tag
+from tasks.models import Task
+
+User = get_user_model()
+PERCENTILES = (50, 90, 99)
+RECIPE_INGREDIENTS = 8
+BULK_SIZE = 10
+LOGIN_USERNAME = 'benchmark-login'
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = round(percent / 100 * (len(values) - 1))
+    return values[index]
+
+
+def image_data():
+    buffer = BytesIO()
+    Image.new('RGB', (2, 2)).save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет эндпоинты API через тестовый клиент и выводит '
+        'перцентили задержки и число SQL-запросов в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--user', help='username пользователя для '
+                                           'запросов с авторизацией')
+        parser.add_argument('--output', help='Файл для JSON-отчёта')
+        parser.add_argument('--compare', help='JSON-отчёт для сравнения')
+
+    def handle(self, *args, **options):
+        user = self.__user__(options['user'])
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.order_by('name').first()
+        if not (recipe and tag and ingredient):
+            raise CommandError(
+                'Нет данных: выполните generate_dataset или loaddata'
+            )
+        author = recipe.author
+        token = Token.objects.get_or_create(user=user)[0]
+        anonymous = Client()
+        authorized = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        admin = self.__admin_client__()
+        ingredient_ids = ','.join(
+            str(pk) for pk in recipe.ingredients.values_list(
+                'id', flat=True
+            )[:RECIPE_INGREDIENTS]
+        )
+        bulk_recipes = list(Recipe.objects.exclude(
+            favorite=user
+        ).exclude(cart=user).values_list('id', flat=True)[:BULK_SIZE])
+        bulk_authors = list(User.objects.exclude(pk=user.pk).exclude(
+            subscribers=user
+        ).values_list('id', flat=True)[:BULK_SIZE])
+        self.recipe_data = {
+            'text': 'Описание',
+            'cooking_time': 10,
+            'tags': list(Tag.objects.values_list('id', flat=True)[:2]),
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 10}
+                for ingredient_id in Ingredient.objects.order_by(
+                    'id'
+                ).values_list('id', flat=True)[:RECIPE_INGREDIENTS]
+            ],
+        }
+        self.login_user, self.credentials = self.__login_user__()
+        owned = self.__create_recipe__(authorized)
+        self.recipe_data['name'] = Recipe.objects.get(pk=owned).name
+        endpoints = {
+            'tags-list': (anonymous, 'get', '/api/tags/'),
+            'tags-detail': (anonymous, 'get', f'/api/tags/{tag.id}/'),
+            'ingredients-search': (
+                anonymous,
+                'get',
+                f'/api/ingredients/?name={ingredient.name[:2]}',
+            ),
+            'ingredients-detail': (
+                anonymous, 'get', f'/api/ingredients/{ingredient.id}/'
+            ),
+            'recipes-list-anonymous': (anonymous, 'get', '/api/recipes/'),
+            'recipes-list': (authorized, 'get', '/api/recipes/?limit=20'),
+            'recipes-list-tags': (
+                authorized, 'get', f'/api/recipes/?tags={tag.slug}'
+            ),
+            'recipes-list-favorited': (
+                authorized, 'get', '/api/recipes/?is_favorited=1'
+            ),
+            'recipes-list-cart': (
+                authorized, 'get', '/api/recipes/?is_in_shopping_cart=1'
+            ),
+            'recipes-list-author': (
+                authorized, 'get', f'/api/recipes/?author={author.id}'
+            ),
+            'recipes-list-cursor': (
+                authorized, 'get', '/api/recipes/?cursor=&limit=20'
+            ),
+            'recipes-list-search': (
+                authorized,
+                'get',
+                f'/api/recipes/?search={recipe.name.split()[-1]}',
+            ),
+            'recipes-list-popular': (
+                authorized, 'get', '/api/recipes/?ordering=popular'
+            ),
+            'recipes-list-trending': (
+                authorized, 'get', '/api/recipes/?ordering=trending'
+            ),
+            'recipes-feed': (authorized, 'get', '/api/recipes/feed/'),
+            'recipes-what-to-cook': (
+                authorized,
+                'get',
+                f'/api/recipes/what_to_cook/?ingredients={ingredient_ids}',
+            ),
+            'recipes-detail': (
+                authorized, 'get', f'/api/recipes/{recipe.id}/'
+            ),
+            'recipes-similar': (
+                authorized, 'get', f'/api/recipes/{recipe.id}/similar/'
+            ),
+            'recipes-favorite': (
+                authorized, 'toggle', f'/api/recipes/{recipe.id}/favorite/'
+            ),
+            'recipes-shopping-cart': (
+                authorized,
+                'toggle',
+                f'/api/recipes/{recipe.id}/shopping_cart/',
+            ),
+            'recipes-favorite-bulk': (
+                authorized, ('bulk', bulk_recipes), '/api/recipes/favorite/'
+            ),
+            'recipes-shopping-cart-bulk': (
+                authorized,
+                ('bulk', bulk_recipes),
+                '/api/recipes/shopping_cart/',
+            ),
+            'recipes-download-shopping-cart': (
+                authorized, 'get', '/api/recipes/download_shopping_cart/'
+            ),
+            'recipes-download-shopping-cart-csv': (
+                authorized,
+                'get',
+                '/api/recipes/download_shopping_cart/?format=csv',
+            ),
+            'recipes-download-shopping-cart-pdf': (
+                authorized,
+                'get',
+                '/api/recipes/download_shopping_cart/?format=pdf',
+            ),
+            'recipes-download-shopping-cart-async': (
+                authorized,
+                'enqueue',
+                '/api/recipes/download_shopping_cart/?async=1',
+            ),
+            'tasks-list': (authorized, 'get', '/api/tasks/'),
+            'users-list': (authorized, 'get', '/api/users/'),
+            'users-detail': (authorized, 'get', f'/api/users/{author.id}/'),
+            'users-me': (authorized, 'get', '/api/users/me/'),
+            'users-subscriptions': (
+                authorized,
+                'get',
+                '/api/users/subscriptions/?recipes_limit=3',
+            ),
+            'users-subscribe': (
+                authorized, 'toggle', f'/api/users/{author.id}/subscribe/'
+            ),
+            'users-subscribe-bulk': (
+                authorized, ('bulk', bulk_authors), '/api/users/subscribe/'
+            ),
+            'recipes-create': (authorized, 'create', '/api/recipes/'),
+            'recipes-update': (
+                authorized, 'update', f'/api/recipes/{owned}/'
+            ),
+            'recipes-delete': (authorized, 'destroy', '/api/recipes/{}/'),
+            'auth-token-login': (
+                anonymous, 'login', '/api/auth/token/login/'
+            ),
+            'auth-token-logout': (
+                anonymous, 'logout', '/api/auth/token/logout/'
+            ),
+        }
+        if admin is None:
+            self.stderr.write(self.style.WARNING(
+                'Нет активного администратора: metrics пропущен'
+            ))
+        else:
+            endpoints['metrics'] = (admin, 'get', '/api/metrics/')
+        report = {
+            'dataset': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'ingredients': Ingredient.objects.count(),
+                'tags': Tag.objects.count(),
+            },
+            'iterations': options['iterations'],
+            'endpoints': {
+                name: self.__measure__(
+                    *endpoint, options['iterations'], options['warmup']
+                )
+                for name, endpoint in endpoints.items()
+            },
+        }
+        self.__remove_recipes__([owned])
+        if options['compare']:
+            with open(options['compare']) as file:
+                self.__compare__(json.load(file), report)
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def __user__(username):
+        users = User.objects.all()
+        if username:
+            users = users.filter(username=username)
+        else:
+            users = users.filter(
+                subscribe__isnull=False, carts__isnull=False
+            ).distinct().order_by('id')
+        user = users.first() or User.objects.order_by('id').first()
+        if user is None:
+            raise CommandError('Нет пользователей для авторизации')
+        return user
+
+    @staticmethod
+    def __admin_client__():
+        admin = User.objects.filter(
+            is_staff=True, is_active=True
+        ).order_by('id').first()
+        if admin is None:
+            return None
+        token = Token.objects.get_or_create(user=admin)[0]
+        return Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    @staticmethod
+    def __request__(client, method, url):
+        if isinstance(method, tuple):
+            data = {'ids': method[1]}
+            return [
+                client.post(url, data, content_type='application/json'),
+                client.delete(url, data, content_type='application/json'),
+            ]
+        if method != 'toggle':
+            return [getattr(client, method)(url)]
+        first = client.post(url)
+        if first.status_code == 400:
+            return [client.delete(url), client.post(url)]
+        return [first, client.delete(url)]
+
+    @staticmethod
+    def __login_user__():
+        """Отдельный пользователь для входа и выхода по токену.
+
+        Выход удаляет токен, поэтому основной пользователь замера
+        для этого не подходит.
+        """
+        password = token_hex(16)
+        user = User.objects.filter(username=LOGIN_USERNAME).first()
+        if user is None:
+            user = User(
+                username=LOGIN_USERNAME,
+                email=f'{LOGIN_USERNAME}@example.com',
+                first_name='Benchmark',
+                last_name='Login',
+            )
+        user.set_password(password)
+        user.save()
+        return user, {'email': user.email, 'password': password}
+
+    def __new_recipe__(self):
+        return dict(
+            self.recipe_data,
+            name=f'Рецепт для замера {token_hex(4)}',
+            image=image_data(),
+        )
+
+    def __create_recipe__(self, client):
+        response = client.post(
+            '/api/recipes/',
+            self.__new_recipe__(),
+            content_type='application/json',
+        )
+        if response.status_code != 201:
+            raise CommandError(
+                f'Не удалось создать рецепт: {response.content[:200]}'
+            )
+        return response.json()['id']
+
+    @staticmethod
+    def __remove_recipes__(recipe_ids):
+        """Удаляет рецепты замера вместе с файлами изображений."""
+        for recipe in Recipe.objects.filter(pk__in=recipe_ids):
+            recipe.delete()
+            default_storage.delete(recipe.image.name)
+            delete_variants(recipe.image_variants)
+
+    def __prepare__(self, client, method, url):
+        """Готовит запрос вне замера.
+
+        Возвращает функцию, выполняющую замеряемые запросы, и функцию
+        уборки, которой передаются полученные ответы.
+        """
+        if method == 'create':
+            return (
+                lambda: [client.post(
+                    url,
+                    self.__new_recipe__(),
+                    content_type='application/json',
+                )],
+                lambda responses: self.__remove_recipes__([
+                    response.json()['id'] for response in responses
+                    if response.status_code == 201
+                ]),
+            )
+        if method == 'update':
+            return (
+                lambda: [client.patch(
+                    url, self.recipe_data, content_type='application/json'
+                )],
+                None,
+            )
+        if method == 'destroy':
+            recipe = Recipe.objects.only('image', 'image_variants').get(
+                pk=self.__create_recipe__(client)
+            )
+
+            def cleanup(responses):
+                default_storage.delete(recipe.image.name)
+                delete_variants(recipe.image_variants)
+
+            return lambda: [client.delete(url.format(recipe.pk))], cleanup
+        if method == 'enqueue':
+            return (
+                lambda: [client.get(url)],
+                lambda responses: Task.objects.filter(pk__in=[
+                    response.json()['id'] for response in responses
+                    if response.status_code == 202
+                ]).delete(),
+            )
+        if method == 'login':
+            return (
+                lambda: [client.post(
+                    url, self.credentials, content_type='application/json'
+                )],
+                None,
+            )
+        if method == 'logout':
+            token = Token.objects.get_or_create(user=self.login_user)[0]
+            return (
+                lambda: [client.post(
+                    url, HTTP_AUTHORIZATION=f'Token {token.key}'
+                )],
+                None,
+            )
+        return lambda: self.__request__(client, method, url), None
+
+    def __measure__(self, client, method, url, iterations, warmup):
+        for _ in range(warmup):
+            request, cleanup = self.__prepare__(client, method, url)
+            responses = request()
+            if cleanup is not None:
+                cleanup(responses)
+        timings = []
+        queries = []
+        statuses = set()
+        for _ in range(iterations):
+            request, cleanup = self.__prepare__(client, method, url)
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                responses = request()
+                for response in responses:
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - start
+            if cleanup is not None:
+                cleanup(responses)
+            timings.append(elapsed * 1000 / len(responses))
+            queries.append(len(context.captured_queries) / len(responses))
+            statuses.update(response.status_code for response in responses)
+        if isinstance(method, tuple):
+            method = method[0]
+        result = {
+            'method': method.upper(),
+            'url': url,
+            'status': sorted(statuses),
+            'queries': max(queries),
+            'mean_ms': round(statistics.mean(timings), 3),
+        }
+        result.update({
+            f'p{percent}_ms': round(percentile(timings, percent), 3)
+            for percent in PERCENTILES
+        })
+        return result
+
+    def __compare__(self, baseline, report):
+        for name, result in report['endpoints'].items():
+            previous = baseline.get('endpoints', {}).get(name)
+            if previous is None:
+                continue
+            result['baseline'] = {
+                'p50_ms': previous['p50_ms'],
+                'queries': previous['queries'],
+            }
+            if result['queries'] > previous['queries']:
+                self.stderr.write(self.style.WARNING(
+                    f"{name}: запросов {previous['queries']} -> "
+                    f"{result['queries']}"
+                ))
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import CommandError
+from django.test import Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from recipes.models import Recipe
+from .benchmark_api import Command as BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Сравнивает авторизованные запросы с пустым и заполненным '
+        'кэшем токенов'
+    )
+
+    def handle(self, *args, **options):
+        user = self.__user__(options['user'])
+        recipe = Recipe.objects.first()
+        if recipe is None:
+            raise CommandError(
+                'Нет данных: выполните generate_dataset или loaddata'
+            )
+        token = Token.objects.get_or_create(user=user)[0]
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        endpoints = {
+            'users-me': (client, 'get', '/api/users/me/'),
+            'recipes-favorite': (
+                client, 'toggle', f'/api/recipes/{recipe.id}/favorite/'
+            ),
+        }
+        report = {'iterations': options['iterations'], 'endpoints': {}}
+        for name, endpoint in endpoints.items():
+            token_cache.clear()
+            with override_settings(
+                AUTH_TOKEN_CACHE_SIZE=0, AUTH_TOKEN_CACHE_ALIAS=None
+            ):
+                cold = self.__measure__(
+                    *endpoint, options['iterations'], options['warmup']
+                )
+            token_cache.clear()
+            warm = self.__measure__(
+                *endpoint, options['iterations'], options['warmup']
+            )
+            report['endpoints'][name] = {
+                'cold': cold,
+                'warm': warm,
+                'saved_queries': cold['queries'] - warm['queries'],
+            }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,101 @@
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+from .benchmark_api import PERCENTILES, percentile
+
+DEFAULT_PATHS = (
+    '/api/tags/',
+    '/api/ingredients/?name=а',
+    '/api/recipes/',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер параллельными клиентами и выводит '
+        'число запросов в секунду и перцентили задержки в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='Запросов на каждый путь')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Путь для нагрузки, можно повторять')
+        parser.add_argument('--token', help='Токен для заголовка '
+                                            'Authorization')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', help='Файл для JSON-отчёта')
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f"Token {options['token']}"
+        report = {
+            'url': options['url'],
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'paths': {
+                path: self.__load__(
+                    Request(options['url'] + path, headers=headers),
+                    options['concurrency'],
+                    options['requests'],
+                    options['timeout'],
+                )
+                for path in options['paths'] or DEFAULT_PATHS
+            },
+        }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def __fetch__(request, timeout):
+        start = time.perf_counter()
+        try:
+            with urlopen(request, timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except HTTPError as error:
+            status = error.code
+        except (URLError, OSError):
+            status = None
+        return status, (time.perf_counter() - start) * 1000
+
+    def __load__(self, request, concurrency, requests, timeout):
+        try:
+            urlopen(request, timeout=timeout).close()
+        except HTTPError:
+            pass
+        except (URLError, OSError) as error:
+            raise CommandError(f'{request.full_url}: {error}')
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(
+                lambda _: self.__fetch__(request, timeout), range(requests)
+            ))
+        elapsed = time.perf_counter() - start
+        timings = [timing for _, timing in results]
+        statuses = {}
+        for status, _ in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        result = {
+            'rps': round(requests / elapsed, 1),
+            'status': statuses,
+            'mean_ms': round(statistics.mean(timings), 3),
+        }
+        result.update({
+            f'p{percent}_ms': round(percentile(timings, percent), 3)
+            for percent in PERCENTILES
+        })
+        return result
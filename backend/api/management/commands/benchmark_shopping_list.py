@@ -0,0 +1,131 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+
+from api.shopping_list import shopping_cart_ingredients, shopping_list_txt
+from api.views import SHOPPING_LIST_CHUNK_SIZE
+from recipes.models import IngredientInRecipe, Recipe
+from .benchmark_api import PERCENTILES, percentile
+from .benchmark_api import Command as BenchmarkCommand
+
+DEFAULT_SIZES = (10, 100, 1000)
+
+
+def legacy_shopping_list(user):
+    """Список покупок так, как его собирал download_shopping_cart до
+    потоковой выгрузки: отдельный exists(), подзапрос по корзине и
+    конкатенация строк."""
+    if not user.carts.exists():
+        return None
+    ingredients = IngredientInRecipe.objects.filter(
+        recipe__in=(user.carts.values('id'))
+    ).values(
+        'ingredients__name',
+        'ingredients__measurement_unit'
+    ).annotate(amount=Sum('amount'))
+    shop_list = 'Список покупок: \n'
+    for ingredient in ingredients:
+        shop_list += (
+            f"{ingredient['ingredients__name']} — "
+            f"{ingredient['amount']} "
+            f"({ingredient['ingredients__measurement_unit']})\n"
+        )
+    return shop_list
+
+
+def streaming_shopping_list(user):
+    ingredients = shopping_cart_ingredients(user).iterator(
+        chunk_size=SHOPPING_LIST_CHUNK_SIZE
+    )
+    return ''.join(shopping_list_txt(ingredients))
+
+
+IMPLEMENTATIONS = {
+    'legacy': legacy_shopping_list,
+    'streaming': streaming_shopping_list,
+}
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Сравнивает прежнюю и потоковую сборку списка покупок для '
+        'корзин разного размера и выводит результат в JSON'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--size', type=int, action='append',
+                            dest='sizes',
+                            help='Число рецептов в корзине, можно '
+                                 'повторять')
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'] or DEFAULT_SIZES)
+        recipe_ids = list(
+            Recipe.objects.order_by('id').values_list('id', flat=True)[
+                :sizes[-1]
+            ]
+        )
+        if len(recipe_ids) < sizes[-1]:
+            raise CommandError(
+                f'Нужно не меньше {sizes[-1]} рецептов: выполните '
+                'generate_dataset'
+            )
+        user = self.__user__(options['user'])
+        report = {'iterations': options['iterations'], 'carts': {}}
+        with transaction.atomic():
+            for size in sizes:
+                self.__fill_cart__(user, recipe_ids[:size])
+                report['carts'][size] = {
+                    name: self.__run__(
+                        function,
+                        user,
+                        options['iterations'],
+                        options['warmup'],
+                    )
+                    for name, function in IMPLEMENTATIONS.items()
+                }
+            transaction.set_rollback(True)
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def __fill_cart__(user, recipe_ids):
+        """Заполняет корзину напрямую через промежуточную таблицу, чтобы
+        не запускать сигналы счётчиков и инвалидации кэша."""
+        through = Recipe.cart.through
+        through.objects.filter(foodgramuser=user).delete()
+        through.objects.bulk_create(
+            through(foodgramuser=user, recipe_id=recipe_id)
+            for recipe_id in recipe_ids
+        )
+
+    @staticmethod
+    def __run__(function, user, iterations, warmup):
+        for _ in range(warmup):
+            function(user)
+        timings = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                shop_list = function(user)
+                timings.append((time.perf_counter() - start) * 1000)
+        result = {
+            'queries': len(context.captured_queries),
+            'lines': shop_list.count('\n') - 1,
+            'mean_ms': round(statistics.mean(timings), 3),
+        }
+        result.update({
+            f'p{percent}_ms': round(percentile(timings, percent), 3)
+            for percent in PERCENTILES
+        })
+        return result
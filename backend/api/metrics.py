@@ -0,0 +1,101 @@
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+METRIC_PREFIX = 'foodgram_'
+
+
+class Histogram:
+    """Гистограмма Prometheus с накопительными корзинами."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield f'{bound}', total
+        yield '+Inf', self.count
+
+
+class MetricsRegistry:
+    """Гистограммы запросов в памяти процесса.
+
+    Каждый воркер gunicorn собирает свои значения, и /api/metrics/
+    отдаёт метрики того процесса, который обработал запрос.
+    """
+
+    metrics = {
+        'request_duration_seconds': (
+            'Время обработки запроса', DURATION_BUCKETS
+        ),
+        'db_queries': ('Число SQL-запросов', QUERY_COUNT_BUCKETS),
+        'db_duration_seconds': (
+            'Суммарное время SQL-запросов', DURATION_BUCKETS
+        ),
+        'renderer_duration_seconds': (
+            'Время работы рендерера DRF над готовыми данными ответа',
+            DURATION_BUCKETS,
+        ),
+        'response_size_bytes': ('Размер ответа', SIZE_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = Lock()
+        self._histograms = defaultdict(dict)
+
+    def observe(self, route, method, **values):
+        with self._lock:
+            for name, value in values.items():
+                if value is None:
+                    continue
+                histograms = self._histograms[name]
+                key = (route, method)
+                if key not in histograms:
+                    histograms[key] = Histogram(self.metrics[name][1])
+                histograms[key].observe(value)
+
+    def render(self, extra=()):
+        lines = []
+        with self._lock:
+            for name, (description, _) in self.metrics.items():
+                metric = METRIC_PREFIX + name
+                lines.append(f'# HELP {metric} {description}')
+                lines.append(f'# TYPE {metric} histogram')
+                for (route, method), histogram in sorted(
+                    self._histograms[name].items()
+                ):
+                    labels = f'route="{route}",method="{method}"'
+                    for bound, total in histogram.samples():
+                        lines.append(
+                            f'{metric}_bucket{{{labels},le="{bound}"}} '
+                            f'{total}'
+                        )
+                    lines.append(f'{metric}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(
+                        f'{metric}_count{{{labels}}} {histogram.count}'
+                    )
+        for name, kind, description, samples in extra:
+            metric = METRIC_PREFIX + name
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} {kind}')
+            for labels, value in samples:
+                lines.append(f'{metric}{labels} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry()
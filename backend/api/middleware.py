@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from .metrics import metrics_registry
+
+logger = logging.getLogger('api.metrics')
+
+
+current_queries = ContextVar('current_queries', default=None)
+
+
+def record_queries(execute, sql, params, many, context):
+    """Пишет время запроса в список текущего HTTP-запроса.
+
+    Список хранится в ContextVar: asgiref копирует контекст в потоки
+    sync_to_async, поэтому запросы из общего потока ASGI попадают
+    к своему HTTP-запросу.
+    """
+    queries = current_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.append((time.perf_counter() - start, sql))
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Подключает record_queries к каждому новому соединению.
+
+    Обёртка ставится первой, чтобы execute_wrapper(), внутри которого
+    открылось соединение, снял со стека свою обёртку, а не эту.
+    """
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_queries)
+
+
+@sync_and_async_middleware
+class MetricsMiddleware:
+    """Собирает время, SQL-запросы и размер ответа по маршрутам.
+
+    Работает и в WSGI, и в ASGI без перехода в поток. Запросы,
+    выполненные при чтении потокового ответа после выхода
+    из представления, в статистику не попадают.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        queries = []
+        token = current_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        self.__observe__(request, response, start, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = []
+        token = current_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        self.__observe__(request, response, start, queries)
+        return response
+
+    def __observe__(self, request, response, start, queries):
+        finished = time.perf_counter()
+        duration = finished - start
+        render_started = getattr(request, '_metrics_render_started', None)
+        match = request.resolver_match
+        route = match.view_name if match else '<unmatched>'
+        metrics_registry.observe(
+            route,
+            request.method,
+            request_duration_seconds=duration,
+            db_queries=len(queries),
+            db_duration_seconds=sum(elapsed for elapsed, _ in queries),
+            renderer_duration_seconds=(
+                finished - render_started if render_started else None
+            ),
+            response_size_bytes=(
+                None if response.streaming else len(response.content)
+            ),
+        )
+        if duration * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+            self.__log_slow__(request, route, duration, queries)
+
+    def process_template_response(self, request, response):
+        request._metrics_render_started = time.perf_counter()
+        return response
+
+    @staticmethod
+    def __log_slow__(request, route, duration, queries):
+        top = sorted(queries, reverse=True)[:settings.METRICS_SLOW_QUERIES]
+        logger.warning(
+            'Медленный запрос %s %s (%s): %.0f мс, SQL-запросов %d%s',
+            request.method,
+            request.get_full_path(),
+            route,
+            duration * 1000,
+            len(queries),
+            ''.join(
+                f'\n  {elapsed * 1000:.1f} мс: {sql}'
+                for elapsed, sql in top
+            ),
+        )
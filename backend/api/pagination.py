@@ -1,5 +1,120 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class LimitCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+
+    def __init__(self, ordering):
+        self.ordering = ordering
 
 
 class LimitPageNumberPagination(PageNumberPagination):
+    """Пагинация page/limit с опциональным курсорным режимом.
+
+    Курсорный режим включается параметром cursor (для первой страницы
+    он может быть пустым) и доступен, если задан cursor_ordering.
+    """
+
     page_size_query_param = 'limit'
+    cursor_ordering = None
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if (
+            self.cursor_ordering
+            and LimitCursorPagination.cursor_query_param
+            in request.query_params
+        ):
+            self.cursor_paginator = LimitCursorPagination(
+                self.cursor_ordering
+            )
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePagination(LimitPageNumberPagination):
+    cursor_ordering = ('-pub_date', '-id')
+
+
+class UserPagination(LimitPageNumberPagination):
+    cursor_ordering = ('-id',)
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по убыванию пары (pub_date, id) без OFFSET.
+
+    Курсор хранит дату публикации и id последнего рецепта страницы,
+    поэтому стоимость страницы не зависит от её номера.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return min(max(size, 1), self.max_page_size)
+
+    def get_position(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            pub_date, pk = urlsafe_b64decode(
+                encoded.encode()
+            ).decode().rsplit(',', 1)
+            position = parse_datetime(pub_date), int(pk)
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def paginate_keys(self, fetch, request):
+        """Возвращает id страницы; fetch(position, limit) отдаёт ключи."""
+        self.request = request
+        size = self.get_page_size(request)
+        keys = fetch(self.get_position(request), size + 1)
+        page = keys[:size]
+        self.next_position = page[-1] if len(keys) > size else None
+        return [pk for _, pk in page]
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        pub_date, pk = self.next_position
+        cursor = urlsafe_b64encode(
+            f'{pub_date.isoformat()},{pk}'.encode()
+        ).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            cursor,
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
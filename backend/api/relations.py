@@ -0,0 +1,75 @@
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
+
+CREATED = 'created'
+EXISTS = 'exists'
+DELETED = 'deleted'
+ABSENT = 'absent'
+NOT_FOUND = 'not_found'
+
+
+def change_relations(manager, objects, ids, add):
+    """Добавляет или удаляет связи пользователя одним запросом.
+
+    manager — менеджер связи (user.carts, user.favorites,
+    user.subscribe), objects — найденные объекты {id: объект}.
+    m2m_changed отправляется только с реально изменёнными id,
+    поэтому счётчики, ленты и версии кэша обновляются так же,
+    как при add/remove. Строка пользователя блокируется до конца
+    транзакции: иначе параллельные запросы с одними id посчитали бы
+    их изменёнными дважды, ведь bulk_create(ignore_conflicts=True)
+    не сообщает, какие строки вставлены. Возвращает {id: статус}.
+    """
+    through = manager.through
+    source = f'{manager.source_field_name}_id'
+    target = f'{manager.target_field_name}_id'
+    instance = manager.instance
+    using = router.db_for_write(through, instance=instance)
+    with transaction.atomic(using=using):
+        owners = type(instance)._default_manager.using(using)
+        owners.select_for_update().filter(pk=instance.pk).exists()
+        existing = set(through.objects.using(using).filter(**{
+            source: instance.pk,
+            f'{target}__in': list(objects),
+        }).values_list(target, flat=True))
+        if add:
+            changed = set(objects) - existing
+        else:
+            changed = set(objects) & existing
+        if changed:
+            signal = {
+                'sender': through,
+                'instance': instance,
+                'reverse': manager.reverse,
+                'model': manager.model,
+                'pk_set': changed,
+                'using': using,
+            }
+            m2m_changed.send(
+                action='pre_add' if add else 'pre_remove', **signal
+            )
+            if add:
+                through.objects.using(using).bulk_create(
+                    (
+                        through(**{source: instance.pk, target: pk})
+                        for pk in changed
+                    ),
+                    ignore_conflicts=True,
+                )
+            else:
+                through.objects.using(using).filter(**{
+                    source: instance.pk,
+                    f'{target}__in': changed,
+                }).delete()
+            m2m_changed.send(
+                action='post_add' if add else 'post_remove', **signal
+            )
+    results = {}
+    for pk in ids:
+        if pk not in objects:
+            results[pk] = NOT_FOUND
+        elif pk in changed:
+            results[pk] = CREATED if add else DELETED
+        else:
+            results[pk] = EXISTS if add else ABSENT
+    return results
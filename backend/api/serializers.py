@@ -1,14 +1,37 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import F
-from drf_extra_fields.fields import Base64ImageField
+from django.core.files.storage import default_storage
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer, SerializerMethodField
 
 from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes.payloads import build_payloads, refresh_payloads
+from recipes.similarity import schedule_update
+from tasks.models import Task
+from .fields import LimitedBase64ImageField
 
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    try:
+        limit = int(request.query_params.get('recipes_limit'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    return limit if limit >= 0 else None
+
+
+def image_variants_urls(request, image_variants):
+    return {
+        variant: {
+            extension: request.build_absolute_uri(default_storage.url(path))
+            for extension, path in formats.items()
+        }
+        for variant, formats in image_variants.get('variants', {}).items()
+    }
+
+
 class TagSerializer(ModelSerializer):
     class Meta:
         model = Tag
@@ -27,6 +50,37 @@ class FavoriteCartRecipeSerializer(ModelSerializer):
         fields = 'id', 'name', 'image', 'cooking_time'
 
 
+class RecipeFinderSerializer(FavoriteCartRecipeSerializer):
+    coverage = serializers.FloatField(read_only=True)
+    missing_ingredients = IngredientSerializer(many=True, read_only=True)
+
+    class Meta(FavoriteCartRecipeSerializer.Meta):
+        fields = FavoriteCartRecipeSerializer.Meta.fields + (
+            'coverage', 'missing_ingredients'
+        )
+
+
+class SimilarRecipeSerializer(FavoriteCartRecipeSerializer):
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(FavoriteCartRecipeSerializer.Meta):
+        fields = FavoriteCartRecipeSerializer.Meta.fields + ('similarity',)
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RELATIONS_LIMIT,
+    )
+
+
+class TaskSerializer(ModelSerializer):
+    class Meta:
+        model = Task
+        fields = 'id', 'name', 'status', 'result', 'created', 'updated'
+
+
 class UserSerializer(ModelSerializer):
     is_subscribed = SerializerMethodField()
 
@@ -56,15 +110,23 @@ class UserSerializer(ModelSerializer):
         return user
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         if user.is_anonymous or (user == obj):
             return False
-        return user.subscribe.filter(id=obj.id).exists()
+        return obj.id in self.__subscriptions__(user)
+
+    def __subscriptions__(self, user):
+        subscriptions = self.context.get('subscriptions')
+        if subscriptions is None:
+            subscriptions = set(user.subscribe.values_list('id', flat=True))
+            self.context['subscriptions'] = subscriptions
+        return subscriptions
 
 
 class SubscribeSerializer(UserSerializer):
-    recipes = FavoriteCartRecipeSerializer(many=True, read_only=True)
-    recipes_count = SerializerMethodField()
+    recipes = SerializerMethodField()
 
     class Meta:
         model = User
@@ -80,17 +142,26 @@ class SubscribeSerializer(UserSerializer):
         )
         read_only_fields = '__all__',
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+    def get_recipes(self, obj):
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            limit = get_recipes_limit(self.context.get('request'))
+            if limit is not None:
+                recipes = recipes[:limit]
+        return FavoriteCartRecipeSerializer(
+            recipes, many=True, context=self.context
+        ).data
 
 
 class RecipeSerializer(ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
-    author = UserSerializer(read_only=True)
+    author = SerializerMethodField()
     ingredients = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
     is_favorited = SerializerMethodField()
-    image = Base64ImageField()
+    image = LimitedBase64ImageField()
+    image_variants = SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -105,20 +176,47 @@ class RecipeSerializer(ModelSerializer):
             'image',
             'text',
             'cooking_time',
+            'favorites_count',
+            'image_variants',
         )
+        read_only_fields = ('favorites_count',)
 
-    def get_ingredients(self, obj):
-        return obj.ingredients.values(
-            'id', 'name', 'measurement_unit', amount=F('ingredient__amount')
+    def get_author(self, obj):
+        author = obj.author
+        if hasattr(obj, 'is_subscribed'):
+            author.is_subscribed = obj.is_subscribed
+        return UserSerializer(author, context=self.context).data
+
+    def get_image_variants(self, obj):
+        return image_variants_urls(
+            self.context.get('request'), obj.image_variants
         )
 
+    def get_ingredients(self, obj):
+        ingredient_amounts = getattr(obj, 'ingredient_amounts', None)
+        if ingredient_amounts is None:
+            ingredient_amounts = obj.recipe.select_related('ingredients')
+        return [
+            {
+                'id': item.ingredients.id,
+                'name': item.ingredients.name,
+                'measurement_unit': item.ingredients.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in ingredient_amounts
+        ]
+
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
         return user.carts.filter(id=obj.id).exists()
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -126,57 +224,148 @@ class RecipeSerializer(ModelSerializer):
 
     def validate(self, data):
         tags = self.initial_data.get('tags')
-        ingredients = self.initial_data.get('ingredients')
-        ingredients_valid = []
+        ingredients = self.initial_data.get('ingredients') or []
         ingredients_id = []
-        if ingredients:
-            for ingredient in ingredients:
-                ingredient_id = ingredient.get('id')
-                if ingredient_id in ingredients_id:
-                    raise serializers.ValidationError(
-                        'Ингредиенты должны быть уникальными'
-                    )
-                selected_ingredient = Ingredient.objects.filter(
-                    id=ingredient_id
-                )
-                amount = ingredient.get('amount')
-                ingredients_id.append(ingredient_id)
-                ingredients_valid.append(
-                    {'ingredient': selected_ingredient, 'amount': amount}
+        for ingredient in ingredients:
+            try:
+                ingredients_id.append(int(ingredient.get('id')))
+            except (TypeError, ValueError):
+                raise serializers.ValidationError(
+                    'Некорректный идентификатор ингредиента'
                 )
+        if len(set(ingredients_id)) != len(ingredients_id):
+            raise serializers.ValidationError(
+                'Ингредиенты должны быть уникальными'
+            )
+        selected_ingredients = Ingredient.objects.in_bulk(ingredients_id)
+        if len(selected_ingredients) != len(ingredients_id):
+            raise serializers.ValidationError(
+                'Ингредиент не найден'
+            )
         data['tags'] = tags
-        data['ingredients'] = ingredients_valid
+        data['ingredients'] = [
+            {
+                'ingredient': selected_ingredients[ingredient_id],
+                'amount': ingredient.get('amount'),
+            }
+            for ingredient_id, ingredient in zip(ingredients_id, ingredients)
+        ]
         data['author'] = self.context.get('request').user
         return data
 
+    @staticmethod
+    def __set_ingredients__(recipe, ingredients, existing=None):
+        existing = existing or {}
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = existing.keys() - amounts.keys()
+        if removed:
+            IngredientInRecipe.objects.filter(
+                recipe=recipe, ingredients__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id, binding in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and binding.amount != amount:
+                binding.amount = amount
+                changed.append(binding)
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ('amount',))
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe,
+                ingredients=ingredient['ingredient'],
+                amount=ingredient['amount'],
+            )
+            for ingredient in ingredients
+            if ingredient['ingredient'].id not in existing
+        )
+
+    @transaction.atomic
     def create(self, validated_data):
         image = validated_data.pop('image')
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(image=image, **validated_data)
         recipe.tags.set(tags)
-        for ingredient in ingredients:
-            IngredientInRecipe.objects.get_or_create(
-                recipe=recipe,
-                ingredients=ingredient['ingredient'][0],
-                amount=ingredient['amount']
-            )
+        self.__set_ingredients__(recipe, ingredients)
+        refresh_payloads(Recipe.objects.filter(pk=recipe.pk))
+        schedule_update(recipe.pk)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
+        if hasattr(instance, 'ingredient_amounts'):
+            del instance.ingredient_amounts
         instance = super().update(instance, validated_data)
         if tags:
-            instance.tags.clear()
-            instance.tags.add(*tags)
+            instance.tags.set(tags)
         if ingredients:
-            instance.ingredients.clear()
-            for ingredient in ingredients:
-                IngredientInRecipe.objects.get_or_create(
-                    recipe=instance,
-                    ingredients=ingredient['ingredient'][0],
-                    amount=ingredient['amount']
-                )
-        instance.save()
+            self.__set_ingredients__(
+                instance,
+                ingredients,
+                existing={
+                    binding.ingredients_id: binding
+                    for binding in instance.recipe.all()
+                },
+            )
+        refresh_payloads(Recipe.objects.filter(pk=instance.pk))
+        schedule_update(instance.pk)
         return instance
+
+
+def fill_missing_payloads(recipes):
+    """Собирает payload рецептов, у которых он ещё пуст, одним пакетом."""
+    missing = {recipe.pk: recipe for recipe in recipes if not recipe.payload}
+    if missing:
+        payloads = build_payloads(Recipe.objects.filter(pk__in=missing))
+        for pk, recipe in missing.items():
+            recipe.payload = payloads[pk]
+    return recipes
+
+
+class RecipeReadListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        return super().to_representation(fill_missing_payloads(list(data)))
+
+
+class RecipeReadSerializer(serializers.BaseSerializer):
+    """Отдаёт сохранённый payload рецепта без разбора по полям.
+
+    Флаги текущего пользователя берутся из аннотаций queryset.
+    Для рецептов без payload он собирается на лету одним пакетом
+    на страницу и в базу не записывается.
+    """
+
+    class Meta:
+        list_serializer_class = RecipeReadListSerializer
+
+    def to_representation(self, instance):
+        payload = fill_missing_payloads([instance])[0].payload
+        request = self.context.get('request')
+        image = payload['image']
+        return {
+            'id': payload['id'],
+            'tags': payload['tags'],
+            'author': dict(
+                payload['author'],
+                is_subscribed=getattr(instance, 'is_subscribed', False),
+            ),
+            'ingredients': payload['ingredients'],
+            'is_in_shopping_cart': getattr(
+                instance, 'is_in_shopping_cart', False
+            ),
+            'is_favorited': getattr(instance, 'is_favorited', False),
+            'name': payload['name'],
+            'image': request.build_absolute_uri(image) if image else None,
+            'text': payload['text'],
+            'cooking_time': payload['cooking_time'],
+            'favorites_count': instance.favorites_count,
+            'image_variants': image_variants_urls(
+                request, instance.image_variants
+            ),
+        }
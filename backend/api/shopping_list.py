@@ -0,0 +1,79 @@
+import csv
+from io import BytesIO
+
+from django.conf import settings
+from django.db.models import Sum
+
+from recipes.models import IngredientInRecipe
+
+TITLE = 'Список покупок:'
+CSV_HEADER = ('Ингредиент', 'Количество', 'Единица измерения')
+PDF_FONT = 'ShoppingListFont'
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+
+
+def shopping_cart_ingredients(user):
+    return IngredientInRecipe.objects.filter(
+        recipe__cart=user
+    ).values(
+        'ingredients__name',
+        'ingredients__measurement_unit'
+    ).annotate(amount=Sum('amount')).order_by(
+        'ingredients__name',
+        'ingredients__measurement_unit'
+    )
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def shopping_list_txt(ingredients):
+    yield f'{TITLE} \n'
+    for ingredient in ingredients:
+        yield (
+            f"{ingredient['ingredients__name']} — "
+            f"{ingredient['amount']} "
+            f"({ingredient['ingredients__measurement_unit']})\n"
+        )
+
+
+def shopping_list_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredients__name'],
+            ingredient['amount'],
+            ingredient['ingredients__measurement_unit'],
+        ))
+
+
+def shopping_list_pdf(ingredients):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
+    if PDF_FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT, settings.SHOPPING_LIST_PDF_FONT)
+        )
+    buffer = BytesIO()
+    width, height = A4
+    line_height = PDF_FONT_SIZE * 1.5
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setFont(PDF_FONT, PDF_FONT_SIZE)
+    y = height - PDF_MARGIN
+    for line in shopping_list_txt(ingredients):
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(PDF_FONT, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        pdf.drawString(PDF_MARGIN, y, line.rstrip('\n'))
+        y -= line_height
+    pdf.save()
+    buffer.seek(0)
+    return buffer
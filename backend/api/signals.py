@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from .authentication import token_cache
+from .cache import COUNTERS_SCOPE, USER_SCOPE, response_cache
+
+User = get_user_model()
+RECIPE_USER_RELATIONS = (Recipe.favorite.through, Recipe.cart.through)
+# Поля автора, которые попадают в ответы с рецептами.
+USER_RENDERED_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+
+def bump_version(model):
+    transaction.on_commit(lambda: response_cache.bump(model))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def bump_model_version(sender, **kwargs):
+    bump_version(sender)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_relations_version(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_version(Recipe)
+
+
+@receiver(m2m_changed, sender=Recipe.favorite.through)
+@receiver(m2m_changed, sender=Recipe.cart.through)
+@receiver(m2m_changed, sender=User.subscribe.through)
+def bump_user_relations_version(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    """Сдвигает версии пользователей, у которых сменились флаги рецептов.
+
+    Для избранного и корзины пользователь — обратная сторона связи,
+    для подписок — прямая. Избранное меняет favorites_count, поэтому
+    сдвигается и COUNTERS_SCOPE из ETag авторизованных ответов.
+    Версия Recipe не сдвигается, чтобы не сбрасывать кэш анонимных
+    ответов: favorites_count в нём отстаёт не дольше окна
+    ResponseCache.epoch().
+    """
+    if not action.startswith('post_'):
+        return
+    if sender is Recipe.favorite.through:
+        transaction.on_commit(
+            lambda: response_cache.bump_scope(COUNTERS_SCOPE)
+        )
+    if reverse == (sender in RECIPE_USER_RELATIONS):
+        users = {instance.pk}
+    elif pk_set:
+        users = set(pk_set)
+    else:
+        bump_version(User)
+        return
+    transaction.on_commit(lambda: bump_user_scopes(users))
+
+
+def bump_user_scopes(users):
+    for user in users:
+        response_cache.bump_scope(USER_SCOPE.format(user))
+
+
+@receiver(pre_save, sender=User)
+def detect_rendered_user_changes(sender, instance, update_fields=None,
+                                 **kwargs):
+    if instance._state.adding:
+        return
+    if update_fields is not None:
+        changed = not set(update_fields).isdisjoint(USER_RENDERED_FIELDS)
+    else:
+        changed = User.objects.filter(pk=instance.pk).values_list(
+            *USER_RENDERED_FIELDS
+        ).first() != tuple(
+            getattr(instance, field) for field in USER_RENDERED_FIELDS
+        )
+    instance._rendered_changed = changed
+
+
+@receiver((post_save, post_delete), sender=User)
+def bump_user_version(sender, instance, created=False, **kwargs):
+    """Сдвигает версию User, только если изменился вид автора.
+
+    Новый пользователь ещё не автор рецептов, а вход, смена пароля
+    или активности не меняют ответы.
+    """
+    if created or not instance.__dict__.pop('_rendered_changed', True):
+        return
+    bump_version(User)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, update_fields=None,
+                           **kwargs):
+    if created:
+        return
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    keys = list(Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ))
+    if keys:
+        invalidate_tokens(keys)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+def invalidate_tokens(keys):
+    """Сбрасывает токены сразу и ещё раз после фиксации транзакции.
+
+    Повторный сброс убирает записи, которые параллельный запрос
+    успел закэшировать до фиксации изменений.
+    """
+    token_cache.invalidate(*keys)
+    transaction.on_commit(lambda: token_cache.invalidate(*keys))
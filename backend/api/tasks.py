@@ -0,0 +1,32 @@
+from uuid import uuid4
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from tasks.registry import task
+from .shopping_list import (
+    shopping_cart_ingredients,
+    shopping_list_csv,
+    shopping_list_pdf,
+    shopping_list_txt
+)
+
+SHOPPING_LISTS_DIR = 'shopping_lists'
+
+
+@task('api.render_shopping_list', result_dir=SHOPPING_LISTS_DIR)
+def render_shopping_list(user_id, file_format):
+    ingredients = shopping_cart_ingredients(user_id).iterator()
+    if file_format == 'pdf':
+        content = shopping_list_pdf(ingredients).getvalue()
+    else:
+        writers = {
+            'txt': shopping_list_txt,
+            'csv': shopping_list_csv,
+        }
+        content = ''.join(writers[file_format](ingredients)).encode()
+    path = default_storage.save(
+        f'{SHOPPING_LISTS_DIR}/{uuid4().hex}.{file_format}',
+        ContentFile(content),
+    )
+    return {'url': default_storage.url(path)}
@@ -1,84 +1,184 @@
+from itertools import chain
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import (
+    Count,
+    BooleanField,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Value,
+    Window,
+    prefetch_related_objects
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
 from djoser.views import UserViewSet
 
-from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
-from .pagination import LimitPageNumberPagination
+from recipes.indexes import ingredient_index, recipe_ingredient_index
+from recipes.models import (
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    SimilarRecipe,
+    Tag
+)
+from recipes.search import search_recipes
+from recipes.timeline import feed_keys
+from tasks.models import Task
+from tasks.queue import enqueue
+from .cache import (
+    COUNTERS_SCOPE,
+    TRENDING_SCOPE,
+    ConditionalResponseMixin,
+    VersionedCacheMixin,
+    response_cache
+)
+from .metrics import metrics_registry
+from .pagination import KeysetPagination, RecipePagination, UserPagination
 from .permissions import AdminOrReadOnly, AuthorStaffOrReadOnly
+from .relations import CREATED, DELETED, NOT_FOUND, change_relations
+from .renderers import (
+    PrometheusRenderer,
+    ShoppingListCsvRenderer,
+    ShoppingListPdfRenderer,
+    ShoppingListTxtRenderer
+)
 from .serializers import (
+    BulkIdsSerializer,
     FavoriteCartRecipeSerializer,
     IngredientSerializer,
+    RecipeFinderSerializer,
+    RecipeReadSerializer,
     RecipeSerializer,
+    SimilarRecipeSerializer,
     SubscribeSerializer,
     TagSerializer,
-    UserSerializer
+    TaskSerializer,
+    UserSerializer,
+    get_recipes_limit
+)
+from .shopping_list import (
+    shopping_cart_ingredients,
+    shopping_list_csv,
+    shopping_list_pdf,
+    shopping_list_txt
 )
 
 
 User = get_user_model()
+SHOPPING_LIST_CHUNK_SIZE = 500
+RECIPE_PAYLOAD_ACTIONS = ('list', 'retrieve', 'feed')
+RECIPE_ORDERINGS = {
+    'popular': ('-favorites_count', '-id'),
+    'trending': ('-trending_score', '-id'),
+}
+# trending_score не сериализуется и меняется только пересчётом
+# рейтинга, поэтому от него зависит лишь порядок ordering=trending.
+ORDERING_SCOPES = {
+    'trending': (TRENDING_SCOPE,),
+}
 
 
 class PostDeleteView:
+    relation_managers = {
+        'subscribe': 'subscribe',
+        'cart': 'carts',
+        'favorite': 'favorites',
+    }
 
-    def __post_del_obj__(self, user_id, action):
-        user = self.request.user
-        if user.is_anonymous:
+    def __change_relations__(self, ids, action):
+        objects = self.queryset.in_bulk(ids)
+        manager = getattr(self.request.user, self.relation_managers[action])
+        return objects, change_relations(
+            manager, objects, ids, self.request.method == 'POST'
+        )
+
+    def __post_del_obj__(self, obj_id, action):
+        if self.request.user.is_anonymous:
             return Response(status=status.HTTP_401_UNAUTHORIZED)
-        actions = {
-            'subscribe': user.subscribe,
-            'cart': user.carts,
-            'favorite': user.favorites,
-        }
-        current_user = actions[action]
-        queryset = get_object_or_404(self.queryset, id=user_id)
-        serializer = self.add_serializer(
-            queryset, context={'request': self.request}
-        )
-        recipe_exist = current_user.filter(id=user_id).exists()
-        if self.request.method == 'POST' and not recipe_exist:
-            current_user.add(queryset)
+        try:
+            obj_id = int(obj_id)
+        except ValueError:
+            raise NotFound
+        objects, results = self.__change_relations__([obj_id], action)
+        result = results[obj_id]
+        if result == NOT_FOUND:
+            raise NotFound
+        if result == CREATED:
+            serializer = self.add_serializer(
+                objects[obj_id], context={'request': self.request}
+            )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        if self.request.method == 'DELETE' and recipe_exist:
-            current_user.remove(queryset)
+        if result == DELETED:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    def __bulk_post_del__(self, action):
+        if self.request.user.is_anonymous:
+            return Response(status=status.HTTP_401_UNAUTHORIZED)
+        serializer = BulkIdsSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        _, results = self.__change_relations__(ids, action)
+        return Response({
+            'results': [{'id': pk, 'status': results[pk]} for pk in ids]
+        })
 
-class TagViewSet(ReadOnlyModelViewSet):
+
+class TagViewSet(ConditionalResponseMixin, VersionedCacheMixin,
+                 ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
+    cache_models = (Tag,)
     serializer_class = TagSerializer
     permission_classes = (AdminOrReadOnly,)
     pagination_class = None
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalResponseMixin, VersionedCacheMixin,
+                        ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
+    cache_models = (Ingredient,)
     serializer_class = IngredientSerializer
     permission_classes = (AdminOrReadOnly,)
     pagination_class = None
 
-    def get_queryset(self):
-        queryset = self.queryset
-        name = self.request.query_params.get('name')
-        name = name.lower()
-        if name:
-            queryset = list(queryset.filter(name__startswith=name))
-        return queryset
+    def list(self, request, *args, **kwargs):
+        return self.__conditional_response__(
+            self.__cached_search__, request, *args, **kwargs
+        )
+
+    def __cached_search__(self, request, *args, **kwargs):
+        return self.__cached_response__(
+            self.__search__, request, *args, **kwargs
+        )
+
+    def __search__(self, request, *args, **kwargs):
+        ingredients = ingredient_index.search(
+            request.query_params.get('name', '')
+        )
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
 
 
 class UserViewSet(UserViewSet, PostDeleteView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     add_serializer = SubscribeSerializer
-    pagination_class = LimitPageNumberPagination
+    pagination_class = UserPagination
 
     @action(methods=('GET',), detail=False)
     def subscriptions(self, request):
@@ -87,58 +187,250 @@ class UserViewSet(UserViewSet, PostDeleteView):
             return Response(status=status.HTTP_401_UNAUTHORIZED)
         authors = user.subscribe.all()
         pages = self.paginate_queryset(authors)
+        prefetch_related_objects(
+            pages,
+            Prefetch(
+                'recipes',
+                queryset=self.__limited_recipes__(
+                    pages, get_recipes_limit(request)
+                ),
+                to_attr='limited_recipes',
+            ),
+        )
         serializer = SubscribeSerializer(
             pages,
             many=True,
-            context={'request': request}
+            context={
+                'request': request,
+                'subscriptions': {author.id for author in pages},
+            }
         )
         return self.get_paginated_response(serializer.data)
 
+    @staticmethod
+    def __limited_recipes__(authors, limit):
+        if not authors:
+            # Пустой author__in не компилируется в SQL (EmptyResultSet).
+            return Recipe.objects.none()
+        recipes = Recipe.objects.filter(author__in=authors)
+        if limit is None:
+            return recipes
+        ranked = recipes.annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('pub_date').desc(), F('id').desc()),
+            )
+        ).order_by().values('id', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        return Recipe.objects.filter(id__in=RawSQL(
+            f'SELECT id FROM ({sql}) AS ranked WHERE row_number <= %s',
+            (*params, limit),
+        ))
+
     @action(methods=('POST', 'DELETE'), detail=True)
     def subscribe(self, request, id):
         action = 'subscribe'
         return self.__post_del_obj__(id, action)
 
+    @action(
+        methods=('POST', 'DELETE'),
+        detail=False,
+        url_path='subscribe',
+        url_name='subscribe-bulk',
+    )
+    def subscribe_bulk(self, request):
+        return self.__bulk_post_del__('subscribe')
+
 
-class RecipeViewSet(ModelViewSet, PostDeleteView):
+class RecipeViewSet(ConditionalResponseMixin, VersionedCacheMixin,
+                    ModelViewSet, PostDeleteView):
     queryset = Recipe.objects.all()
+    cache_models = (Recipe, Tag, Ingredient, IngredientInRecipe, User)
+    counter_scopes = (COUNTERS_SCOPE,)
     serializer_class = RecipeSerializer
     permission_classes = (AuthorStaffOrReadOnly,)
     add_serializer = FavoriteCartRecipeSerializer
-    pagination_class = LimitPageNumberPagination
+    pagination_class = RecipePagination
+    lookup_value_regex = r'\d+'
 
-    @staticmethod
-    def __ingredien_in_recipe_filter__(user):
-        return IngredientInRecipe.objects.filter(
-            recipe__in=(user.carts.values('id'))
-        ).values(
-            'ingredients__name',
-            'ingredients__measurement_unit'
-        ).annotate(amount=Sum('amount'))
+    def get_cache_scopes(self):
+        return ORDERING_SCOPES.get(
+            self.request.query_params.get('ordering'), ()
+        )
+
+    def get_last_modified(self, request, *args, **kwargs):
+        if self.action != 'retrieve' or not request.user.is_anonymous:
+            return None
+        if not str(kwargs['pk']).isdigit():
+            return None
+        updated_at = Recipe.objects.filter(pk=kwargs['pk']).values_list(
+            'updated_at', flat=True
+        ).first()
+        return int(updated_at.timestamp()) if updated_at else None
+
+    def get_serializer_class(self):
+        if self.action in RECIPE_PAYLOAD_ACTIONS:
+            return RecipeReadSerializer
+        return super().get_serializer_class()
+
+    def __annotated_queryset__(self):
+        """Рецепты с флагами пользователя, без фильтров из параметров."""
+        if self.action in RECIPE_PAYLOAD_ACTIONS:
+            queryset = self.queryset.only(
+                'id',
+                'author_id',
+                'pub_date',
+                'favorites_count',
+                'image_variants',
+                'payload',
+            )
+        else:
+            queryset = self.queryset.select_related('author').defer(
+                'search_vector', 'payload'
+            ).prefetch_related(
+                'tags',
+                Prefetch(
+                    'recipe',
+                    queryset=IngredientInRecipe.objects.select_related(
+                        'ingredients'
+                    ),
+                    to_attr='ingredient_amounts',
+                ),
+            )
+        user = self.request.user
+        if user.is_anonymous:
+            queryset = queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                is_subscribed=Value(False, output_field=BooleanField()),
+            )
+        else:
+            queryset = queryset.annotate(
+                is_favorited=Exists(
+                    user.favorites.filter(pk=OuterRef('pk'))
+                ),
+                is_in_shopping_cart=Exists(
+                    user.carts.filter(pk=OuterRef('pk'))
+                ),
+                is_subscribed=Exists(
+                    user.subscribe.filter(pk=OuterRef('author'))
+                ),
+            )
+        return queryset
 
     def get_queryset(self):
-        queryset = self.queryset
+        queryset = self.__annotated_queryset__()
+        user = self.request.user
         tags = self.request.query_params.getlist('tags')
         if tags:
-            queryset = queryset.filter(tags__slug__in=tags).distinct()
-        user = self.request.user
+            queryset = queryset.filter(Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe=OuterRef('pk'), tag__slug__in=tags
+                )
+            ))
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_recipes(queryset, search)
+        ordering = RECIPE_ORDERINGS.get(
+            self.request.query_params.get('ordering')
+        )
+        if ordering:
+            queryset = queryset.order_by(*ordering)
         if user.is_anonymous:
             return queryset
         author = self.request.query_params.get('author')
         if author:
             queryset = queryset.filter(author=author)
         is_in_shopping = self.request.query_params.get('is_in_shopping_cart')
-        if is_in_shopping == '1':
-            queryset = queryset.filter(cart=user.id)
-        elif is_in_shopping == '0':
-            queryset = queryset.exclude(cart=user.id)
+        if is_in_shopping in ('0', '1'):
+            queryset = queryset.filter(
+                is_in_shopping_cart=is_in_shopping == '1'
+            )
         is_favorited = self.request.query_params.get('is_favorited')
-        if is_favorited == '1':
-            queryset = queryset.filter(favorite=user.id)
-        elif is_favorited == '0':
-            queryset = queryset.exclude(favorite=user.id)
+        if is_favorited in ('0', '1'):
+            queryset = queryset.filter(is_favorited=is_favorited == '1')
         return queryset
 
+    @action(methods=('GET',), detail=False)
+    def feed(self, request):
+        user = request.user
+        if user.is_anonymous:
+            return Response(status=status.HTTP_401_UNAUTHORIZED)
+        paginator = KeysetPagination()
+        ids = paginator.paginate_keys(
+            lambda position, limit: feed_keys(user, position, limit),
+            request,
+        )
+        recipes = self.__annotated_queryset__().in_bulk(ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(methods=('GET',), detail=False)
+    def what_to_cook(self, request):
+        try:
+            ingredient_ids = [
+                int(ingredient_id)
+                for value in request.query_params.getlist('ingredients')
+                for ingredient_id in value.split(',')
+                if ingredient_id
+            ]
+            limit = min(
+                int(request.query_params.get('limit', 20)),
+                settings.RECIPE_FINDER_LIMIT,
+            )
+        except ValueError:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        found = recipe_ingredient_index.find(ingredient_ids, limit)
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in found]
+        )
+        missing = Ingredient.objects.in_bulk({
+            ingredient_id
+            for _, _, missing_ids in found
+            for ingredient_id in missing_ids
+        })
+        results = []
+        for recipe_id, coverage, missing_ids in found:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.coverage = coverage
+            recipe.missing_ingredients = [
+                missing[ingredient_id]
+                for ingredient_id in missing_ids
+                if ingredient_id in missing
+            ]
+            results.append(recipe)
+        serializer = RecipeFinderSerializer(
+            results, many=True, context={'request': request}
+        )
+        return Response(serializer.data)
+
+    @action(methods=('GET',), detail=True)
+    def similar(self, request, pk=None):
+        entries = SimilarRecipe.objects.filter(
+            recipe_id=pk
+        ).select_related('similar').only(
+            'score',
+            'similar__id',
+            'similar__name',
+            'similar__image',
+            'similar__cooking_time',
+        ).order_by('-score')[:settings.SIMILAR_RECIPES_K]
+        results = []
+        for entry in entries:
+            entry.similar.similarity = entry.score
+            results.append(entry.similar)
+        if not results:
+            get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        serializer = SimilarRecipeSerializer(
+            results, many=True, context={'request': request}
+        )
+        return Response(serializer.data)
+
     @action(detail=True, methods=('POST', 'DELETE'))
     def favorite(self, request, pk=None):
         action = 'favorite'
@@ -149,17 +441,109 @@ class RecipeViewSet(ModelViewSet, PostDeleteView):
         action = 'cart'
         return self.__post_del_obj__(pk, action)
 
-    @action(methods=('GET',), detail=False)
+    @action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        url_path='favorite',
+        url_name='favorite-bulk',
+    )
+    def favorite_bulk(self, request):
+        return self.__bulk_post_del__('favorite')
+
+    @action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+    )
+    def shopping_cart_bulk(self, request):
+        return self.__bulk_post_del__('cart')
+
+    @action(
+        methods=('GET',),
+        detail=False,
+        renderer_classes=(
+            ShoppingListTxtRenderer,
+            ShoppingListCsvRenderer,
+            ShoppingListPdfRenderer,
+        ),
+    )
     def download_shopping_cart(self, request):
         user = request.user
-        if not user.carts.exists():
+        if user.is_anonymous:
+            return Response(status=status.HTTP_401_UNAUTHORIZED)
+        ingredients = shopping_cart_ingredients(user).iterator(
+            chunk_size=SHOPPING_LIST_CHUNK_SIZE
+        )
+        first = next(ingredients, None)
+        if first is None:
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        ingredients = self.__ingredien_in_recipe_filter__(user)
-        shop_list = 'Список покупок: \n'
-        for ingredient in ingredients:
-            shop_list += (
-                f"{ingredient['ingredients__name']} — "
-                f"{ingredient['amount']} "
-                f"({ingredient['ingredients__measurement_unit']})\n"
+        ingredients = chain((first,), ingredients)
+        renderer = request.accepted_renderer
+        if request.query_params.get('async') == '1':
+            task = enqueue(
+                'api.render_shopping_list',
+                user.id,
+                renderer.format,
+                owner=user,
             )
-        return HttpResponse(shop_list, content_type='text/plain')
+            return JsonResponse(
+                TaskSerializer(task).data, status=status.HTTP_202_ACCEPTED
+            )
+        filename = f'shopping_list.{renderer.format}'
+        if renderer.format == 'pdf':
+            return FileResponse(
+                shopping_list_pdf(ingredients),
+                as_attachment=True,
+                filename=filename,
+                content_type=renderer.media_type,
+            )
+        writers = {
+            'txt': shopping_list_txt,
+            'csv': shopping_list_csv,
+        }
+        response = StreamingHttpResponse(
+            writers[renderer.format](ingredients),
+            content_type=f'{renderer.media_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{filename}"'
+        )
+        return response
+
+
+class TaskViewSet(ReadOnlyModelViewSet):
+    serializer_class = TaskSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = None
+
+    def get_queryset(self):
+        return Task.objects.filter(owner=self.request.user)
+
+
+class MetricsView(APIView):
+    renderer_classes = (PrometheusRenderer,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        cache_stats = response_cache.stats()
+        tasks = Task.objects.order_by().values_list('status').annotate(
+            count=Count('id')
+        )
+        return Response(metrics_registry.render(extra=(
+            (
+                'response_cache_requests_total',
+                'counter',
+                'Обращения к кэшу ответов',
+                [
+                    (f'{{result="{result}"}}', value)
+                    for result, value in cache_stats.items()
+                ],
+            ),
+            (
+                'tasks',
+                'gauge',
+                'Фоновые задачи по статусам',
+                [(f'{{status="{name}"}}', count) for name, count in tasks],
+            ),
+        )))
@@ -19,16 +19,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
     'api',
     'users',
     'recipes',
+    'tasks',
     'colorfield'
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +79,26 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
+RESPONSE_CACHE_ALIAS = os.getenv('RESPONSE_CACHE_ALIAS', default='default')
+
+INDEX_CACHE_ALIAS = os.getenv('INDEX_CACHE_ALIAS', default='default')
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=3600))
+
+HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', default=60))
+
+BULK_RELATIONS_LIMIT = int(os.getenv('BULK_RELATIONS_LIMIT', default=100))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -113,7 +136,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -139,3 +162,85 @@ DJOSER = {
 }
 
 AUTH_USER_MODEL = 'users.FoodgramUser'
+
+INGREDIENT_SEARCH_LIMIT = int(
+    os.getenv('INGREDIENT_SEARCH_LIMIT', default=50)
+)
+
+RECIPE_INGREDIENT_INDEX_TTL = int(
+    os.getenv('RECIPE_INGREDIENT_INDEX_TTL', default=300)
+)
+
+RECIPE_FINDER_LIMIT = 100
+
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', default=5 * 1024 ** 2)
+)
+
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (320, 320),
+    'card': (640, 640),
+    'full': (1280, 1280),
+}
+
+DATA_UPLOAD_MAX_MEMORY_SIZE = RECIPE_IMAGE_MAX_SIZE * 4 // 3 + 1024 ** 2
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+TASKS_ALWAYS_EAGER = os.getenv('TASKS_ALWAYS_EAGER', default='') == 'True'
+
+TASKS_RETRY_DELAY = int(os.getenv('TASKS_RETRY_DELAY', default=10))
+
+TASKS_RUNNING_TIMEOUT = int(os.getenv('TASKS_RUNNING_TIMEOUT', default=600))
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='') == 'True'
+
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', default=1000))
+
+FEED_BACKFILL_LIMIT = int(os.getenv('FEED_BACKFILL_LIMIT', default=500))
+
+TRENDING_HALF_LIFE_HOURS = float(
+    os.getenv('TRENDING_HALF_LIFE_HOURS', default=24)
+)
+
+TRENDING_MIN_SCORE = float(os.getenv('TRENDING_MIN_SCORE', default=0.01))
+
+TRENDING_EVENT_LAG = int(os.getenv('TRENDING_EVENT_LAG', default=5))
+
+SIMILAR_RECIPES_K = int(os.getenv('SIMILAR_RECIPES_K', default=10))
+
+SIMILAR_TAG_WEIGHT = float(os.getenv('SIMILAR_TAG_WEIGHT', default=0.5))
+
+SIMILAR_UPDATE_DELAY = int(os.getenv('SIMILAR_UPDATE_DELAY', default=30))
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', default=10000))
+
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', default=60))
+
+AUTH_TOKEN_CACHE_ALIAS = os.getenv('AUTH_TOKEN_CACHE_ALIAS', default=None)
+
+METRICS_SLOW_REQUEST_MS = int(
+    os.getenv('METRICS_SLOW_REQUEST_MS', default=500)
+)
+
+METRICS_SLOW_QUERIES = int(os.getenv('METRICS_SLOW_QUERIES', default=5))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.metrics': {
+            'handlers': ('console',),
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
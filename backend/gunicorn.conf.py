@@ -0,0 +1,40 @@
+"""Настройки gunicorn.
+
+SERVER_MODE=wsgi (по умолчанию) запускает синхронные воркеры,
+SERVER_MODE=asgi — воркеры uvicorn с ASGI-приложением. В режиме
+asgi стоит также включить ASYNC_READ_VIEWS=True.
+
+Версии кэша ответов и индексов должны храниться в общем кэше,
+поэтому с несколькими воркерами и LocMemCache сервер не запускается.
+"""
+import multiprocessing
+import os
+
+SERVER_MODE = os.getenv('SERVER_MODE', default='wsgi')
+
+bind = os.getenv('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = int(os.getenv(
+    'GUNICORN_WORKERS', default=multiprocessing.cpu_count() * 2 + 1
+))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', default=5))
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+    worker_class = 'sync'
+
+
+def on_starting(server):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from api.checks import local_cache_aliases
+
+    aliases = local_cache_aliases()
+    if server.cfg.workers > 1 and aliases:
+        raise RuntimeError(
+            f'Кэши {", ".join(aliases)} используют LocMemCache, а воркеров '
+            f'{server.cfg.workers}: задайте CACHE_BACKEND и CACHE_LOCATION '
+            'общего кэша или GUNICORN_WORKERS=1'
+        )
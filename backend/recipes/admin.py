@@ -1,6 +1,8 @@
 from django.contrib import admin
 
 from .models import Ingredient, IngredientInRecipe, Recipe, Tag
+from .payloads import refresh_payloads
+from .similarity import schedule_update
 
 EMPTY_MESSAGE = '-пусто-'
 
@@ -26,13 +28,18 @@ class IngredientAdmin(admin.ModelAdmin):
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('name', 'author', 'is_favorited')
-    search_fields = ('author', 'name', 'tags',)
+    search_fields = ('name', 'author__username', 'tags__name',)
     list_filter = ('author', 'name', 'tags')
     empty_value_display = EMPTY_MESSAGE
     inlines = (IngredientInRecipeInline,)
 
     def is_favorited(self, obj):
-        return obj.favorite.count()
+        return obj.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        refresh_payloads(Recipe.objects.filter(pk=form.instance.pk))
+        schedule_update(form.instance.pk)
 
 
 @admin.register(Tag)
@@ -0,0 +1,30 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(count=Count('pk')).values('count')
+        ),
+        0
+    )
+
+
+def recount_counters(recipe_model, user_model):
+    """Пересчитывает денормализованные счётчики одним UPDATE на таблицу."""
+    recipes = recipe_model.objects.update(
+        favorites_count=count_subquery(user_model.objects, 'favorites'),
+        carts_count=count_subquery(user_model.objects, 'carts'),
+    )
+    users = user_model.objects.update(
+        recipes_count=count_subquery(recipe_model.objects, 'author'),
+        followers_count=count_subquery(user_model.objects, 'subscribe'),
+    )
+    return recipes, users
+
+
+def change_counter(queryset, field, delta, **values):
+    return queryset.update(**{field: F(field) + delta}, **values)
@@ -0,0 +1,64 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .models import Recipe
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+VARIANTS_DIR = 'media/variants'
+
+
+def render_variants(source, name):
+    """Сохраняет уменьшенные копии изображения во всех форматах."""
+    with Image.open(source) as image:
+        image.load()
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        variants = {}
+        for variant, size in settings.RECIPE_IMAGE_VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+            variants[variant] = {}
+            for extension, (image_format, params) in VARIANT_FORMATS.items():
+                buffer = BytesIO()
+                resized.save(buffer, image_format, **params)
+                variants[variant][extension] = default_storage.save(
+                    f'{VARIANTS_DIR}/{name}-{variant}.{extension}',
+                    ContentFile(buffer.getvalue()),
+                )
+        return variants
+
+
+def delete_variants(image_variants):
+    for formats in image_variants.get('variants', {}).values():
+        for path in formats.values():
+            default_storage.delete(path)
+
+
+def generate_image_variants(recipe_id):
+    recipe = Recipe.objects.only('image', 'image_variants').filter(
+        pk=recipe_id
+    ).first()
+    if recipe is None or not recipe.image:
+        return None
+    source = recipe.image.name
+    name = os.path.splitext(os.path.basename(source))[0]
+    with recipe.image.open('rb') as file:
+        variants = render_variants(file, name)
+    current = Recipe.objects.filter(pk=recipe_id).values_list(
+        'image', flat=True
+    ).first()
+    if current != source:
+        delete_variants({'variants': variants})
+        return None
+    delete_variants(recipe.image_variants)
+    recipe.image_variants = {'source': source, 'variants': variants}
+    recipe.save(update_fields=('image_variants', 'updated_at'))
+    return recipe.image_variants
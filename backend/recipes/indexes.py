@@ -0,0 +1,261 @@
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from heapq import nlargest
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Ingredient, IngredientInRecipe
+
+INGREDIENT_INDEX_VERSION_KEY = 'ingredient-index:version'
+RECIPE_INDEX_VERSION_KEY = 'recipe-ingredient-index:version'
+
+
+def shared_version(cache, key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_shared_version(cache, key):
+    """Сдвигает общую версию и возвращает новую или None."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+        return None
+
+
+class IngredientPrefixIndex:
+    """Отсортированный в памяти процесса индекс названий ингредиентов.
+
+    Каталог почти не меняется, поэтому поиск для автодополнения
+    выполняется бинарным поиском по списку без обращения к базе.
+    Индекс строится при первом запросе и перестраивается, когда
+    меняется общая версия в INDEX_CACHE_ALIAS: её сдвигает
+    invalidate() из любого процесса.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._keys = None
+        self._ingredients = None
+        self._version = None
+
+    @property
+    def cache(self):
+        return caches[settings.INDEX_CACHE_ALIAS]
+
+    def invalidate(self):
+        bump_shared_version(self.cache, INGREDIENT_INDEX_VERSION_KEY)
+        with self._lock:
+            self._keys = None
+            self._ingredients = None
+
+    def _load(self):
+        version = shared_version(self.cache, INGREDIENT_INDEX_VERSION_KEY)
+        with self._lock:
+            if self._ingredients is None or self._version != version:
+                ingredients = sorted(
+                    Ingredient.objects.all(),
+                    key=lambda item: (item.name.lower(), item.measurement_unit)
+                )
+                self._keys = [item.name.lower() for item in ingredients]
+                self._ingredients = ingredients
+                self._version = version
+            return self._keys, self._ingredients
+
+    def search(self, name='', limit=None):
+        """Ингредиенты, начинающиеся с name, затем содержащие name."""
+        keys, ingredients = self._load()
+        if limit is None:
+            limit = settings.INGREDIENT_SEARCH_LIMIT
+        if not name:
+            return ingredients[:limit]
+        name = name.lower()
+        start = end = bisect_left(keys, name)
+        while end < len(keys) and keys[end].startswith(name):
+            end += 1
+        result = ingredients[start:end][:limit]
+        if len(result) >= limit:
+            return result
+        for key, ingredient in zip(keys, ingredients):
+            if name in key and not key.startswith(name):
+                result.append(ingredient)
+                if len(result) >= limit:
+                    break
+        return result
+
+
+class RecipeIngredientIndex:
+    """Инвертированный индекс «ингредиент -> рецепты» в памяти процесса.
+
+    Изменения рецептов применяются инкрементально через сигналы и
+    сдвигают общую версию в INDEX_CACHE_ALIAS, по которой остальные
+    процессы перестраивают индекс. Перестройка раз в
+    RECIPE_INGREDIENT_INDEX_TTL секунд подтягивает изменения,
+    сделанные без сигналов.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._build_lock = Lock()
+        self._postings = None
+        self._recipes = None
+        self._built_at = 0
+        self._generation = 0
+        self._version = None
+        self._changed = None
+
+    @property
+    def cache(self):
+        return caches[settings.INDEX_CACHE_ALIAS]
+
+    def _bump_version(self):
+        """Сдвигает общую версию после изменения в этом процессе.
+
+        Если до сдвига индекс был актуален, он уже содержит изменение
+        и остаётся актуальным с новой версией.
+        """
+        version = bump_shared_version(self.cache, RECIPE_INDEX_VERSION_KEY)
+        if version is None:
+            return
+        with self._lock:
+            if self._version == version - 1 and self._changed is None:
+                self._version = version
+
+    def invalidate(self):
+        bump_shared_version(self.cache, RECIPE_INDEX_VERSION_KEY)
+        with self._lock:
+            self._postings = None
+            self._recipes = None
+            self._generation += 1
+
+    def _fresh(self, version):
+        return (
+            self._recipes is not None
+            and self._version == version
+            and time.monotonic() - self._built_at
+            <= settings.RECIPE_INGREDIENT_INDEX_TTL
+        )
+
+    def _load(self):
+        """Перестраивает пустой или устаревший индекс вне self._lock.
+
+        Строит один поток; остальные тем временем отвечают по старому
+        индексу и ждут, только если индекса ещё нет.
+        """
+        version = shared_version(self.cache, RECIPE_INDEX_VERSION_KEY)
+        with self._lock:
+            if self._fresh(version):
+                return
+            stale = self._recipes is not None
+        if not self._build_lock.acquire(blocking=not stale):
+            return
+        try:
+            with self._lock:
+                if self._fresh(version):
+                    return
+            self._build(version)
+        finally:
+            self._build_lock.release()
+
+    def _build(self, version):
+        with self._lock:
+            generation = self._generation
+            self._changed = set()
+        postings = defaultdict(set)
+        recipes = defaultdict(set)
+        bindings = IngredientInRecipe.objects.values_list(
+            'recipe_id', 'ingredients_id'
+        ).order_by().iterator()
+        self._apply(postings, recipes, bindings)
+        # Рецепты, изменённые во время сборки, перечитываются заново,
+        # пока за время чтения не перестанут появляться новые.
+        while True:
+            with self._lock:
+                changed, self._changed = self._changed, set()
+                if not changed:
+                    self._changed = None
+                    self._postings = postings
+                    self._recipes = recipes
+                    self._version = version
+                    self._built_at = (
+                        time.monotonic()
+                        if generation == self._generation else 0
+                    )
+                    return
+            for recipe_id in changed:
+                self._discard(postings, recipes, recipe_id)
+            self._apply(postings, recipes, self._bindings(changed))
+
+    @staticmethod
+    def _bindings(recipe_ids):
+        return list(IngredientInRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredients_id'))
+
+    @staticmethod
+    def _discard(postings, recipes, recipe_id):
+        for ingredient_id in recipes.pop(recipe_id, ()):
+            postings[ingredient_id].discard(recipe_id)
+
+    @staticmethod
+    def _apply(postings, recipes, bindings):
+        for recipe_id, ingredient_id in bindings:
+            recipes[recipe_id].add(ingredient_id)
+            postings[ingredient_id].add(recipe_id)
+
+    def refresh_recipe(self, recipe_id):
+        bindings = self._bindings([recipe_id])
+        with self._lock:
+            if self._changed is not None:
+                self._changed.add(recipe_id)
+            if self._recipes is not None:
+                self._discard(self._postings, self._recipes, recipe_id)
+                self._apply(self._postings, self._recipes, bindings)
+        self._bump_version()
+
+    def remove_recipe(self, recipe_id):
+        with self._lock:
+            if self._changed is not None:
+                self._changed.add(recipe_id)
+            if self._recipes is not None:
+                self._discard(self._postings, self._recipes, recipe_id)
+        self._bump_version()
+
+    def find(self, ingredient_ids, limit):
+        """Рецепты с наибольшей долей имеющихся ингредиентов.
+
+        Возвращает кортежи (recipe_id, coverage, missing_ingredient_ids).
+        """
+        self._load()
+        with self._lock:
+            postings, recipes = self._postings or {}, self._recipes or {}
+            available = set(ingredient_ids)
+            matches = Counter()
+            for ingredient_id in available:
+                matches.update(postings.get(ingredient_id, ()))
+            best = nlargest(
+                limit,
+                matches.items(),
+                key=lambda item: (
+                    item[1] / len(recipes[item[0]]), item[1], item[0]
+                ),
+            )
+            return [
+                (
+                    recipe_id,
+                    matched / len(recipes[recipe_id]),
+                    sorted(recipes[recipe_id] - available),
+                )
+                for recipe_id, matched in best
+            ]
+
+
+ingredient_index = IngredientPrefixIndex()
+recipe_ingredient_index = RecipeIngredientIndex()
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import SIMILARITY_BATCH_SIZE, rebuild_similar
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие рецепты по косинусному сходству '
+        'ингредиентов и тегов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=SIMILARITY_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        recipes = rebuild_similar(options['batch_size'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецептов обработано: {recipes} за {elapsed:.2f} с'
+        ))
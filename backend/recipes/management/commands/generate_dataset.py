@@ -0,0 +1,187 @@
+import random
+from itertools import islice
+from secrets import token_hex
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import response_cache
+from api.views import RecipeViewSet
+from recipes.counters import recount_counters
+from recipes.indexes import ingredient_index
+from recipes.models import (
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    Tag,
+    TimelineEntry
+)
+from recipes.payloads import refresh_payloads
+from recipes.timeline import rebuild_timelines
+
+User = get_user_model()
+PASSWORD = 'synthetic-password'
+TAG_COLORS = ('#E26C2D', '#49B64E', '#8775D2', '#F0C808', '#3F88C5')
+
+
+class Command(BaseCommand):
+    help = 'Генерирует синтетический набор данных заданного размера'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--tags', type=int, default=5)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Избранных рецептов на пользователя')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Рецептов в корзине на пользователя')
+        parser.add_argument('--subscriptions', type=int, default=10,
+                            help='Подписок на пользователя')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = f'synthetic-{token_hex(4)}'
+        with transaction.atomic():
+            tags = self.__tags__(options['tags'])
+            ingredients = self.__ingredients__(options['ingredients'])
+            users = self.__users__(options['users'])
+            recipes = self.__recipes__(options['recipes'], users)
+            self.__recipe_relations__(
+                recipes,
+                tags,
+                ingredients,
+                options['tags_per_recipe'],
+                options['ingredients_per_recipe'],
+            )
+            self.__user_relations__(
+                users,
+                recipes,
+                options['favorites'],
+                options['carts'],
+                options['subscriptions'],
+            )
+            recount_counters(Recipe, User)
+            refresh_payloads(Recipe.objects.filter(pk__in=recipes))
+            rebuild_timelines(TimelineEntry, Recipe, User)
+        ingredient_index.invalidate()
+        # Пакетные вставки не отправляют сигналы, сбрасывающие кэш ответов.
+        for model in RecipeViewSet.cache_models:
+            response_cache.bump(model)
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.prefix}: пользователей {len(users)}, '
+            f'рецептов {len(recipes)}, ингредиентов {len(ingredients)}, '
+            f'тегов {len(tags)}'
+        ))
+
+    def __bulk_create__(self, model, objects):
+        objects = iter(objects)
+        batch = list(islice(objects, self.batch_size))
+        while batch:
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = list(islice(objects, self.batch_size))
+
+    def __sample__(self, population, size):
+        return self.random.sample(population, min(size, len(population)))
+
+    def __tags__(self, count):
+        existing = Tag.objects.count()
+        self.__bulk_create__(Tag, (
+            Tag(
+                name=f'Тег {number}',
+                slug=f'tag-{number}',
+                color=TAG_COLORS[number % len(TAG_COLORS)],
+            )
+            for number in range(existing, count)
+        ))
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def __ingredients__(self, count):
+        existing = Ingredient.objects.count()
+        self.__bulk_create__(Ingredient, (
+            Ingredient(
+                name=f'{self.prefix} ингредиент {number}',
+                measurement_unit='г',
+            )
+            for number in range(existing, count)
+        ))
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def __users__(self, count):
+        password = make_password(PASSWORD)
+        self.__bulk_create__(User, (
+            User(
+                username=f'{self.prefix}-{number}',
+                email=f'{self.prefix}-{number}@example.com',
+                first_name='Имя',
+                last_name='Фамилия',
+                password=password,
+            )
+            for number in range(count)
+        ))
+        return list(User.objects.filter(
+            username__startswith=self.prefix
+        ).values_list('id', flat=True))
+
+    def __recipes__(self, count, users):
+        if not users:
+            return []
+        self.__bulk_create__(Recipe, (
+            Recipe(
+                name=f'{self.prefix} рецепт {number}',
+                author_id=self.random.choice(users),
+                text='Синтетическое описание рецепта. ' * 10,
+                cooking_time=self.random.randint(1, 600),
+            )
+            for number in range(count)
+        ))
+        return list(Recipe.objects.filter(
+            name__startswith=self.prefix
+        ).values_list('id', flat=True))
+
+    def __recipe_relations__(self, recipes, tags, ingredients,
+                             tags_per_recipe, ingredients_per_recipe):
+        self.__bulk_create__(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+            for recipe in recipes
+            for tag in self.__sample__(tags, tags_per_recipe)
+        ))
+        self.__bulk_create__(IngredientInRecipe, (
+            IngredientInRecipe(
+                recipe_id=recipe,
+                ingredients_id=ingredient,
+                amount=self.random.randint(1, 1000),
+            )
+            for recipe in recipes
+            for ingredient in self.__sample__(
+                ingredients, ingredients_per_recipe
+            )
+        ))
+
+    def __user_relations__(self, users, recipes, favorites, carts,
+                           subscriptions):
+        self.__bulk_create__(Recipe.favorite.through, (
+            Recipe.favorite.through(recipe_id=recipe, foodgramuser_id=user)
+            for user in users
+            for recipe in self.__sample__(recipes, favorites)
+        ))
+        self.__bulk_create__(Recipe.cart.through, (
+            Recipe.cart.through(recipe_id=recipe, foodgramuser_id=user)
+            for user in users
+            for recipe in self.__sample__(recipes, carts)
+        ))
+        self.__bulk_create__(User.subscribe.through, (
+            User.subscribe.through(
+                from_foodgramuser_id=user, to_foodgramuser_id=author
+            )
+            for user in users
+            for author in self.__sample__(users, subscriptions)
+            if author != user
+        ))
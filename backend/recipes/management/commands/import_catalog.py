@@ -0,0 +1,219 @@
+import csv
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from api.cache import response_cache
+from recipes.indexes import ingredient_index
+from recipes.models import Ingredient, Tag
+from tasks.queue import enqueue
+
+CATALOG_MODELS = {
+    'recipes.ingredient': Ingredient,
+    'recipes.tag': Tag,
+}
+# bulk_update не отправляет сигналы, поэтому payload рецептов
+# с обновлёнными строками пересобирается по этим фильтрам.
+PAYLOAD_FILTERS = {
+    Ingredient: 'ingredients__in',
+    Tag: 'tags__in',
+}
+READ_CHUNK_SIZE = 64 * 1024
+REPORTED_CONFLICTS = 20
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield 'recipes.ingredient', None, {
+                'name': row[0].strip(),
+                'measurement_unit': row[1].strip(),
+            }
+
+
+def read_json(file):
+    """Потоково читает массив объектов фикстуры, не загружая его целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if not started and buffer.startswith('['):
+            buffer = buffer[1:]
+            started = True
+            continue
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except ValueError:
+            if eof:
+                if buffer.strip():
+                    raise CommandError('Некорректный JSON в фикстуре')
+                return
+            chunk = file.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield item.get('model'), item.get('pk'), item.get('fields', {})
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты и теги из CSV или JSON-фикстуры '
+        'пакетными вставками'
+    )
+    default_path = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=self.default_path)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Загружать CSV через COPY во временную таблицу (PostgreSQL)',
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Перезаписывать существующие строки с тем же pk, '
+                 'если данные отличаются',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path or not os.path.exists(path):
+            raise CommandError(f'Файл не найден: {path}')
+        start = time.perf_counter()
+        is_json = path.endswith('.json')
+        conflicts = []
+        with open(path, encoding='utf-8') as file, transaction.atomic():
+            if options['copy'] and not is_json:
+                if connection.vendor != 'postgresql':
+                    raise CommandError('--copy доступен только в PostgreSQL')
+                rows = self.__copy_ingredients__(file)
+            else:
+                reader = read_json(file) if is_json else read_csv(file)
+                rows = self.__bulk_import__(
+                    reader, options['batch_size'], options['update'],
+                    conflicts,
+                )
+                self.__reset_sequences__()
+            if options['update'] and conflicts:
+                self.__refresh_payloads__(conflicts)
+        ingredient_index.invalidate()
+        for model in CATALOG_MODELS.values():
+            response_cache.bump(model)
+        elapsed = time.perf_counter() - start
+        if conflicts:
+            self.__report_conflicts__(conflicts, options['update'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {rows} за {elapsed:.2f} с '
+            f'({rows / elapsed if elapsed else rows:.0f} строк/с)'
+        ))
+
+    def __bulk_import__(self, reader, batch_size, update, conflicts):
+        rows = 0
+        batches = {label: [] for label in CATALOG_MODELS}
+        for label, pk, fields in reader:
+            model = CATALOG_MODELS.get(label)
+            if model is None:
+                continue
+            batches[label].append(model(pk=pk, **fields))
+            rows += 1
+            if len(batches[label]) >= batch_size:
+                conflicts.extend(
+                    self.__save_batch__(model, batches[label], update)
+                )
+                batches[label] = []
+        for label, objects in batches.items():
+            conflicts.extend(self.__save_batch__(
+                CATALOG_MODELS[label], objects, update
+            ))
+        return rows
+
+    @staticmethod
+    def __save_batch__(model, objects, update):
+        """Вставляет новые строки и возвращает строки фикстуры, чей pk уже
+        занят записью с другими данными."""
+        fields = [
+            field.attname for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        with_pk = {obj.pk: obj for obj in objects if obj.pk is not None}
+        existing = model.objects.in_bulk(list(with_pk))
+        conflicts = [
+            with_pk[pk] for pk, current in existing.items()
+            if any(
+                getattr(with_pk[pk], field) != getattr(current, field)
+                for field in fields
+            )
+        ]
+        model.objects.bulk_create(
+            [obj for obj in objects if obj.pk not in existing],
+            ignore_conflicts=True,
+        )
+        if update and conflicts:
+            model.objects.bulk_update(conflicts, fields)
+        return conflicts
+
+    @staticmethod
+    def __reset_sequences__():
+        """Сдвигает последовательности pk за явные pk из фикстуры."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), list(CATALOG_MODELS.values())
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    @staticmethod
+    def __refresh_payloads__(updated):
+        pks = {model: [] for model in PAYLOAD_FILTERS}
+        for obj in updated:
+            pks[type(obj)].append(obj.pk)
+        for model, lookup in PAYLOAD_FILTERS.items():
+            if pks[model]:
+                enqueue('recipes.refresh_payloads', **{lookup: pks[model]})
+
+    def __report_conflicts__(self, conflicts, update):
+        action = 'обновлено' if update else 'пропущено'
+        self.stderr.write(self.style.WARNING(
+            f'Строк с занятым pk и другими данными {action}: '
+            f'{len(conflicts)}'
+        ))
+        for obj in conflicts[:REPORTED_CONFLICTS]:
+            self.stderr.write(f'  {obj._meta.label_lower} pk={obj.pk}: {obj}')
+        if len(conflicts) > REPORTED_CONFLICTS:
+            self.stderr.write(
+                f'  ... и ещё {len(conflicts) - REPORTED_CONFLICTS}'
+            )
+        if not update:
+            self.stderr.write('Запустите с --update, чтобы перезаписать их')
+
+    @staticmethod
+    def __copy_ingredients__(file):
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredient_staging '
+                '(name varchar(200), measurement_unit varchar(200)) '
+                'ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                'COPY ingredient_staging FROM STDIN WITH (FORMAT csv)', file
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT trim(name), trim(measurement_unit) '
+                'FROM ingredient_staging '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            cursor.execute('SELECT count(*) FROM ingredient_staging')
+            return cursor.fetchone()[0]
@@ -0,0 +1,12 @@
+import os
+
+from django.conf import settings
+
+from .import_catalog import Command as ImportCatalogCommand
+
+
+class Command(ImportCatalogCommand):
+    help = 'Загружает ингредиенты из data/ingredients.csv'
+    default_path = os.path.join(
+        os.path.dirname(settings.BASE_DIR), 'data', 'ingredients.csv'
+    )
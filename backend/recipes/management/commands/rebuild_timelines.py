@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import Recipe, TimelineEntry
+from recipes.timeline import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает ленты подписок по текущим подпискам'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            entries = rebuild_timelines(
+                TimelineEntry, Recipe, get_user_model()
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {entries}'
+        ))
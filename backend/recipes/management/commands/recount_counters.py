@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipes.counters import recount_counters
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики избранного, корзин, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        recipes, users = recount_counters(Recipe, get_user_model())
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {recipes}, пользователей: {users}'
+        ))
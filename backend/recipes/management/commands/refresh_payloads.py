@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import response_cache
+from recipes.models import Recipe
+from recipes.payloads import refresh_payloads
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает готовые представления рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        updated = refresh_payloads(
+            Recipe.objects.all(), options['batch_size']
+        )
+        response_cache.bump(Recipe)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {updated}'
+        ))
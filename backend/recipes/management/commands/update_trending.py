@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.cache import TRENDING_SCOPE, response_cache
+from recipes.ranking import prune_events, update_trending
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинг трендов по новым событиям'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Повторять пересчёт каждые N секунд',
+        )
+        parser.add_argument(
+            '--prune-days',
+            type=int,
+            help='Удалить учтённые события старше N дней',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            recipes = update_trending()
+            if recipes:
+                response_cache.bump_scope(TRENDING_SCOPE)
+            message = f'Обновлено рецептов: {recipes}'
+            if options['prune_days'] is not None:
+                events = prune_events(options['prune_days'])
+                message += f', удалено событий: {events}'
+            self.stdout.write(self.style.SUCCESS(message))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:30
+
+from django.db import migrations, models
+
+USER_RECIPE_INDEXES = (
+    ('recipe_favorite_user_idx', 'recipes_recipe_favorite'),
+    ('recipe_cart_user_idx', 'recipes_recipe_cart'),
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date'], name='recipe_author_pub_date_idx'),
+        ),
+    ] + [
+        migrations.RunSQL(
+            f'CREATE INDEX {name} ON {table} (foodgramuser_id, recipe_id);',
+            f'DROP INDEX {name};',
+        )
+        for name, table in USER_RECIPE_INDEXES
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:44
+
+from itertools import islice
+
+from django.db import migrations, models
+from django.db.models import Prefetch
+
+BATCH_SIZE = 500
+
+
+def build_payload(recipe):
+    author = recipe.author
+    return {
+        'id': recipe.id,
+        'tags': [
+            {
+                'id': tag.id,
+                'name': tag.name,
+                'color': tag.color,
+                'slug': tag.slug,
+            }
+            for tag in recipe.tags.all()
+        ],
+        'author': {
+            'id': author.id,
+            'email': author.email,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+        },
+        'ingredients': [
+            {
+                'id': item.ingredients.id,
+                'name': item.ingredients.name,
+                'measurement_unit': item.ingredients.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.ingredient_amounts
+        ],
+        'name': recipe.name,
+        'image': recipe.image.url if recipe.image else None,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def fill_payloads(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    ids = Recipe.objects.order_by('pk').values_list('pk', flat=True).iterator()
+    batch = list(islice(ids, BATCH_SIZE))
+    while batch:
+        recipes = list(Recipe.objects.filter(pk__in=batch).select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredients'
+                ),
+                to_attr='ingredient_amounts',
+            ),
+        ))
+        for recipe in recipes:
+            recipe.payload = build_payload(recipe)
+        Recipe.objects.bulk_update(recipes, ('payload',))
+        batch = list(islice(ids, BATCH_SIZE))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Готовое представление'),
+        ),
+        migrations.RunPython(fill_payloads, migrations.RunPython.noop),
+    ]
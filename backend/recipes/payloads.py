@@ -0,0 +1,82 @@
+from itertools import islice
+
+from django.db.models import Prefetch
+from django.utils import timezone
+
+PAYLOAD_BATCH_SIZE = 500
+
+
+def build_payload(recipe):
+    """Всё представление рецепта, кроме флагов текущего пользователя."""
+    author = recipe.author
+    return {
+        'id': recipe.id,
+        'tags': [
+            {
+                'id': tag.id,
+                'name': tag.name,
+                'color': tag.color,
+                'slug': tag.slug,
+            }
+            for tag in recipe.tags.all()
+        ],
+        'author': {
+            'id': author.id,
+            'email': author.email,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+        },
+        'ingredients': [
+            {
+                'id': item.ingredients.id,
+                'name': item.ingredients.name,
+                'measurement_unit': item.ingredients.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.ingredient_amounts
+        ],
+        'name': recipe.name,
+        'image': recipe.image.url if recipe.image else None,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def build_payloads(queryset):
+    """Собирает payload рецептов queryset тремя запросами: {pk: payload}."""
+    ingredient_amounts = queryset.model._meta.get_field('recipe').related_model
+    recipes = queryset.select_related('author').prefetch_related(
+        'tags',
+        Prefetch(
+            'recipe',
+            queryset=ingredient_amounts.objects.select_related('ingredients'),
+            to_attr='ingredient_amounts',
+        ),
+    ).defer('search_vector', 'payload')
+    return {recipe.pk: build_payload(recipe) for recipe in recipes}
+
+
+def refresh_payloads(queryset, batch_size=PAYLOAD_BATCH_SIZE):
+    """Пересобирает payload рецептов из queryset пакетами.
+
+    Вместе с payload сдвигается updated_at, по которому
+    отдаётся Last-Modified.
+    """
+    model = queryset.model
+    ids = queryset.order_by('pk').values_list(
+        'pk', flat=True
+    ).distinct().iterator()
+    batch = list(islice(ids, batch_size))
+    updated = 0
+    while batch:
+        payloads = build_payloads(model.objects.filter(pk__in=batch))
+        now = timezone.now()
+        recipes = [
+            model(pk=pk, payload=payload, updated_at=now)
+            for pk, payload in payloads.items()
+        ]
+        model.objects.bulk_update(recipes, ('payload', 'updated_at'))
+        updated += len(recipes)
+        batch = list(islice(ids, batch_size))
+    return updated
@@ -0,0 +1,97 @@
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+
+from .models import Recipe, RecipeEvent, TrendingCheckpoint
+
+RELATION_EVENTS = {
+    Recipe.favorite.through: RecipeEvent.FAVORITE,
+    Recipe.cart.through: RecipeEvent.CART,
+}
+SCORE_BATCH_SIZE = 500
+
+
+def log_events(sender, pairs, delta):
+    """Записывает события по парам (recipe_id, user_id)."""
+    kind = RELATION_EVENTS[sender]
+    RecipeEvent.objects.bulk_create(
+        RecipeEvent(recipe_id=recipe, user_id=user, kind=kind, delta=delta)
+        for recipe, user in pairs
+    )
+
+
+def decay(seconds):
+    return 0.5 ** (seconds / 3600 / settings.TRENDING_HALF_LIFE_HOURS)
+
+
+@transaction.atomic
+def update_trending(now=None):
+    """Инкрементально пересчитывает Recipe.trending_score.
+
+    Накопленные рейтинги умножаются на коэффициент затухания за время
+    с прошлого пересчёта, затем добавляются новые события с весом
+    по их возрасту. Затухание обновляет только ненулевые рейтинги,
+    а совсем малые обнуляются, поэтому пересчёт затрагивает лишь
+    рецепты с недавней активностью. События моложе TRENDING_EVENT_LAG
+    секунд ждут следующего пересчёта, чтобы не пропустить записи
+    из ещё не зафиксированных транзакций.
+
+    Возвращает число рецептов, чьё место в порядке trending могло
+    измениться: с новыми событиями или обнулённым рейтингом. Общее
+    затухание порядок не меняет.
+    """
+    now = now or timezone.now()
+    checkpoint = TrendingCheckpoint.objects.select_for_update().get_or_create(
+        pk=1
+    )[0]
+    scored = Recipe.objects.exclude(trending_score=0)
+    zeroed = 0
+    if checkpoint.computed_at is not None:
+        factor = decay((now - checkpoint.computed_at).total_seconds())
+        scored.update(trending_score=F('trending_score') * factor)
+        zeroed = scored.filter(
+            trending_score__gt=-settings.TRENDING_MIN_SCORE,
+            trending_score__lt=settings.TRENDING_MIN_SCORE,
+        ).update(trending_score=0)
+    events = RecipeEvent.objects.filter(
+        id__gt=checkpoint.last_event_id,
+        created__lte=now - timedelta(seconds=settings.TRENDING_EVENT_LAG),
+    ).order_by('id').values_list('id', 'recipe_id', 'delta', 'created')
+    scores = defaultdict(float)
+    last_event_id = checkpoint.last_event_id
+    for event_id, recipe, delta, created in events.iterator():
+        scores[recipe] += delta * decay((now - created).total_seconds())
+        last_event_id = event_id
+    items = iter(scores.items())
+    batch = list(islice(items, SCORE_BATCH_SIZE))
+    while batch:
+        Recipe.objects.filter(pk__in=[recipe for recipe, _ in batch]).update(
+            trending_score=F('trending_score') + Case(
+                *(
+                    When(pk=recipe, then=Value(score))
+                    for recipe, score in batch
+                ),
+                output_field=FloatField(),
+            )
+        )
+        batch = list(islice(items, SCORE_BATCH_SIZE))
+    checkpoint.last_event_id = last_event_id
+    checkpoint.computed_at = now
+    checkpoint.save()
+    return len(scores) + zeroed
+
+
+def prune_events(days):
+    """Удаляет учтённые события старше days дней."""
+    checkpoint = TrendingCheckpoint.objects.filter(pk=1).first()
+    if checkpoint is None:
+        return 0
+    return RecipeEvent.objects.filter(
+        id__lte=checkpoint.last_event_id,
+        created__lt=timezone.now() - timedelta(days=days),
+    ).delete()[0]
@@ -0,0 +1,60 @@
+from django.db import connection
+from django.db.models import Case, F, Func, IntegerField, Q, Value, When
+
+SEARCH_CONFIG = 'russian'
+
+
+class Casefold(Func):
+    function = 'casefold'
+
+
+def casefold(value):
+    return None if value is None else value.casefold()
+
+
+def register_casefold(sender, connection, **kwargs):
+    """Регистрирует casefold() в соединениях SQLite.
+
+    Встроенные LIKE и lower() в SQLite не учитывают регистр только
+    для ASCII, поэтому без неё поиск по кириллице зависит от регистра.
+    """
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function('casefold', 1, casefold)
+
+
+def search_recipes(queryset, text):
+    """Полнотекстовый поиск рецептов с нечётким поиском по названию.
+
+    В PostgreSQL используется хранимый search_vector и pg_trgm,
+    в остальных СУБД — поиск подстроки в названии и описании
+    без учёта регистра.
+    """
+    if connection.vendor != 'postgresql':
+        name, body = Q(name__icontains=text), Q(text__icontains=text)
+        if connection.vendor == 'sqlite':
+            queryset = queryset.alias(
+                search_name=Casefold('name'), search_text=Casefold('text')
+            )
+            text = text.casefold()
+            name = Q(search_name__contains=text)
+            body = Q(search_text__contains=text)
+        return queryset.filter(name | body).annotate(
+            rank=Case(
+                When(name, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        ).order_by('-rank', '-pub_date')
+    from django.contrib.postgres.search import (
+        SearchQuery,
+        SearchRank,
+        TrigramSimilarity
+    )
+
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.filter(
+        Q(search_vector=query) | Q(name__trigram_similar=text)
+    ).annotate(
+        rank=SearchRank(F('search_vector'), query),
+        similarity=TrigramSimilarity('name', text),
+    ).order_by('-rank', '-similarity', '-pub_date')
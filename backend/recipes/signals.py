@@ -0,0 +1,223 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.functions import Now
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete
+)
+from django.dispatch import receiver
+
+from tasks.queue import enqueue
+from .counters import change_counter
+from .indexes import ingredient_index, recipe_ingredient_index
+from .models import (
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    SimilarRecipe,
+    Tag
+)
+from .ranking import log_events
+from .similarity import schedule_update
+from .timeline import backfill, fan_out, restore, trim
+
+User = get_user_model()
+RELATION_COUNTERS = {
+    Recipe.favorite.through: ('favorites_count', 'favorite'),
+    Recipe.cart.through: ('carts_count', 'cart'),
+}
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    transaction.on_commit(ingredient_index.invalidate)
+
+
+def enqueue_payloads_refresh(**filters):
+    transaction.on_commit(
+        lambda: enqueue('recipes.refresh_payloads', **filters)
+    )
+
+
+@receiver(post_save, sender=Tag)
+def refresh_tag_payloads(sender, instance, created, **kwargs):
+    if not created:
+        enqueue_payloads_refresh(tags=instance.pk)
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_ingredient_payloads(sender, instance, created, **kwargs):
+    if not created:
+        enqueue_payloads_refresh(ingredients=instance.pk)
+
+
+@receiver(post_save, sender=User)
+def refresh_author_payloads(sender, instance, created, update_fields,
+                            **kwargs):
+    if created:
+        return
+    if update_fields and set(update_fields) <= {'last_login', 'password'}:
+        return
+    # recipes_count у переданного объекта может быть устаревшим.
+    if Recipe.objects.filter(author=instance.pk).exists():
+        enqueue_payloads_refresh(author=instance.pk)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def refresh_payloads_on_delete(sender, instance, **kwargs):
+    if sender is Tag:
+        recipes = instance.recipes.values_list('pk', flat=True)
+    else:
+        recipes = instance.ingredient.values_list('recipe_id', flat=True)
+    recipe_ids = list(recipes)
+    if recipe_ids:
+        enqueue_payloads_refresh(recipe_ids=recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=IngredientInRecipe)
+def refresh_recipe_ingredient_index(sender, instance, **kwargs):
+    recipe_id = instance.recipe_id if sender is IngredientInRecipe else (
+        instance.pk
+    )
+    transaction.on_commit(
+        lambda: recipe_ingredient_index.refresh_recipe(recipe_id)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    if not instance.image:
+        return
+    if instance.image_variants.get('source') == instance.image.name:
+        return
+    recipe_id = instance.pk
+    transaction.on_commit(
+        lambda: enqueue('recipes.generate_image_variants', recipe_id)
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def refill_similar_recipes(sender, instance, **kwargs):
+    schedule_update(instance.pk, SimilarRecipe.objects.filter(
+        similar_id=instance.pk
+    ).values_list('recipe_id', flat=True))
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_ingredient_index(sender, instance, **kwargs):
+    recipe_id = instance.pk
+    transaction.on_commit(
+        lambda: recipe_ingredient_index.remove_recipe(recipe_id)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'recipes_count', 1
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        fan_out(instance)
+
+
+@receiver(m2m_changed, sender=User.subscribe.through)
+def update_timelines(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            trim(author_ids=(instance.pk,))
+        else:
+            instance._cleared_authors = list(
+                instance.subscribe.values_list('pk', flat=True)
+            )
+            trim(user_ids=(instance.pk,))
+        return
+    if action == 'post_clear':
+        restore(instance.__dict__.pop('_cleared_authors', ()), 1)
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    if reverse:
+        users, authors = pk_set, (instance.pk,)
+    else:
+        users, authors = (instance.pk,), pk_set
+    if action == 'post_add':
+        backfill(users, authors)
+    else:
+        trim(users, authors)
+        restore(authors, len(users))
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_counter(
+        User.objects.filter(pk=instance.author_id), 'recipes_count', -1
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.favorite.through)
+@receiver(m2m_changed, sender=Recipe.cart.through)
+def change_relation_count(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    counter, relation = RELATION_COUNTERS[sender]
+    if action == 'pre_clear':
+        if reverse:
+            change_counter(
+                Recipe.objects.filter(**{relation: instance}),
+                counter,
+                -1,
+                updated_at=Now(),
+            )
+        else:
+            Recipe.objects.filter(pk=instance.pk).update(
+                **{counter: 0}, updated_at=Now()
+            )
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    delta = 1 if action == 'post_add' else -1
+    if reverse:
+        change_counter(
+            Recipe.objects.filter(pk__in=pk_set),
+            counter,
+            delta,
+            updated_at=Now(),
+        )
+    else:
+        change_counter(
+            Recipe.objects.filter(pk=instance.pk),
+            counter,
+            delta * len(pk_set),
+            updated_at=Now(),
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.favorite.through)
+@receiver(m2m_changed, sender=Recipe.cart.through)
+def log_relation_events(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    if action == 'pre_clear':
+        field = 'foodgramuser_id' if reverse else 'recipe_id'
+        log_events(
+            sender,
+            sender.objects.filter(**{field: instance.pk}).values_list(
+                'recipe_id', 'foodgramuser_id'
+            ),
+            -1,
+        )
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    if reverse:
+        pairs = [(recipe, instance.pk) for recipe in pk_set]
+    else:
+        pairs = [(instance.pk, user) for user in pk_set]
+    log_events(sender, pairs, 1 if action == 'post_add' else -1)
@@ -0,0 +1,221 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import enqueue
+
+from .models import IngredientInRecipe, Recipe, SimilarRecipe
+
+SIMILARITY_BATCH_SIZE = 256
+UPDATE_SIMILAR_TASK = 'recipes.update_similar'
+
+
+def build_matrix():
+    """Разреженная матрица «рецепт x (ингредиенты + теги)».
+
+    Строки нормированы по L2, поэтому произведение строк равно
+    косинусному сходству рецептов.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    recipe_ids = np.fromiter(
+        Recipe.objects.order_by('id').values_list('id', flat=True),
+        dtype=np.int64,
+    )
+    positions = {recipe: row for row, recipe in enumerate(recipe_ids)}
+    features = (
+        (IngredientInRecipe.objects.values_list(
+            'recipe_id', 'ingredients_id'
+        ), 0, 1.0),
+        (Recipe.tags.through.objects.values_list(
+            'recipe_id', 'tag_id'
+        ), 1, settings.SIMILAR_TAG_WEIGHT),
+    )
+    rows, columns, weights = [], [], []
+    for bindings, offset, weight in features:
+        for recipe, feature in bindings.iterator():
+            # Рецепты, созданные после чтения id, пересчитаются
+            # собственным update_similar.
+            if recipe not in positions:
+                continue
+            rows.append(positions[recipe])
+            columns.append(feature * 2 + offset)
+            weights.append(weight)
+    width = max(columns) + 1 if columns else 1
+    matrix = sparse.csr_matrix(
+        (weights, (rows, columns)), shape=(len(recipe_ids), width)
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return recipe_ids, sparse.diags(1 / norms) @ matrix
+
+
+def top_neighbours(recipe_ids, row, columns, values, k):
+    """Top-k по строке сходства без самого рецепта и нулевых оценок."""
+    import numpy as np
+
+    mask = (columns != row) & (values > 0)
+    columns, values = columns[mask], values[mask]
+    if len(values) > k:
+        top = np.argpartition(-values, k)[:k]
+        columns, values = columns[top], values[top]
+    order = np.argsort(-values, kind='stable')
+    return [
+        (int(recipe_ids[column]), float(value))
+        for column, value in zip(columns[order], values[order])
+    ]
+
+
+def neighbours(recipe_ids, matrix, rows, k):
+    """Top-k соседей для строк rows: {recipe_id: [(similar_id, score)]}."""
+    scores = (matrix[rows] @ matrix.T).tocsr()
+    result = {}
+    for position, row in enumerate(rows):
+        start, end = scores.indptr[position], scores.indptr[position + 1]
+        result[int(recipe_ids[row])] = top_neighbours(
+            recipe_ids,
+            row,
+            scores.indices[start:end],
+            scores.data[start:end],
+            k,
+        )
+    return result
+
+
+def lock_similar():
+    """Блокирует запись в таблицу похожих рецептов до конца транзакции.
+
+    Удаление и вставка соседей из двух задач одновременно иначе
+    нарушают unique_similar_recipe: вторая транзакция не видит строк,
+    вставленных первой. Режим SHARE ROW EXCLUSIVE не мешает чтению.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'LOCK TABLE {SimilarRecipe._meta.db_table} '
+                'IN SHARE ROW EXCLUSIVE MODE'
+            )
+
+
+def save_neighbours(result):
+    SimilarRecipe.objects.filter(recipe_id__in=result).delete()
+    SimilarRecipe.objects.bulk_create(
+        (
+            SimilarRecipe(recipe_id=recipe, similar_id=similar, score=score)
+            for recipe, items in result.items()
+            for similar, score in items
+        ),
+        batch_size=SIMILARITY_BATCH_SIZE * settings.SIMILAR_RECIPES_K,
+    )
+
+
+def rebuild_similar(batch_size=SIMILARITY_BATCH_SIZE):
+    """Пересчитывает таблицу похожих рецептов целиком."""
+    recipe_ids, matrix = build_matrix()
+    k = settings.SIMILAR_RECIPES_K
+    with transaction.atomic():
+        lock_similar()
+        SimilarRecipe.objects.all().delete()
+        for start in range(0, len(recipe_ids), batch_size):
+            rows = range(start, min(start + batch_size, len(recipe_ids)))
+            save_neighbours(neighbours(recipe_ids, matrix, list(rows), k))
+    return len(recipe_ids)
+
+
+def positions(recipe_ids, ids):
+    """Номера строк матрицы для существующих рецептов из ids."""
+    import numpy as np
+
+    ids = sorted(ids)
+    rows = np.searchsorted(recipe_ids, ids)
+    return [
+        int(row) for row, recipe in zip(rows, ids)
+        if row < len(recipe_ids) and recipe_ids[row] == recipe
+    ]
+
+
+def update_similar(changed, affected=()):
+    """Обновляет соседей изменённых рецептов и списки, в которые они входят.
+
+    Матрица строится один раз на всю пачку changed. Пересчитываются
+    строки самих рецептов, рецептов, у которых они были в списке
+    похожих, и рецептов, в чей top-k они теперь попадают. Для удалённых
+    рецептов пересчитываются только переданные affected.
+    """
+    recipe_ids, matrix = build_matrix()
+    k = settings.SIMILAR_RECIPES_K
+    changed = set(changed)
+    affected = set(affected)
+    result = {}
+    rows = positions(recipe_ids, changed)
+    if rows:
+        scores = (matrix[rows] @ matrix.T).tocsr()
+        affected.update(SimilarRecipe.objects.filter(
+            similar_id__in=changed
+        ).values_list('recipe_id', flat=True))
+        thresholds = {
+            item['recipe_id']: (item['lowest'], item['total'])
+            for item in SimilarRecipe.objects.order_by().values(
+                'recipe_id'
+            ).annotate(lowest=Min('score'), total=Count('id'))
+        }
+        for position, row in enumerate(rows):
+            start, end = scores.indptr[position], scores.indptr[position + 1]
+            columns = scores.indices[start:end]
+            values = scores.data[start:end]
+            result[int(recipe_ids[row])] = top_neighbours(
+                recipe_ids, row, columns, values, k
+            )
+            for column, value in zip(columns, values):
+                lowest, total = thresholds.get(
+                    int(recipe_ids[column]), (0, 0)
+                )
+                if total < k or value >= lowest:
+                    affected.add(int(recipe_ids[column]))
+    rows = positions(recipe_ids, affected - changed)
+    if rows:
+        result.update(neighbours(recipe_ids, matrix, rows, k))
+    with transaction.atomic():
+        lock_similar()
+        save_neighbours(result)
+    return len(result)
+
+
+def enqueue_update(recipe_id, affected):
+    """Добавляет рецепт в ожидающую задачу пересчёта или создаёт новую.
+
+    Задача ставится с задержкой SIMILAR_UPDATE_DELAY, поэтому серия
+    сохранений рецептов пересчитывается одной сборкой матрицы.
+    Задачу, которую уже забрал обработчик, skip_locked пропускает.
+    """
+    with transaction.atomic():
+        task = Task.objects.select_for_update(skip_locked=True).filter(
+            name=UPDATE_SIMILAR_TASK, status=Task.PENDING
+        ).order_by('run_at').first()
+        if task is None:
+            return enqueue(
+                UPDATE_SIMILAR_TASK,
+                [recipe_id],
+                list(affected),
+                run_at=timezone.now() + timedelta(
+                    seconds=settings.SIMILAR_UPDATE_DELAY
+                ),
+            )
+        changed, pending = task.args
+        task.args = [
+            sorted(set(changed) | {recipe_id}),
+            sorted(set(pending) | set(affected)),
+        ]
+        task.save(update_fields=('args', 'updated'))
+        return task
+
+
+def schedule_update(recipe_id, affected=()):
+    """Ставит пересчёт похожих рецептов в очередь после коммита."""
+    affected = list(affected)
+    transaction.on_commit(lambda: enqueue_update(recipe_id, affected))
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+
+from api.cache import TRENDING_SCOPE, response_cache
+from tasks.registry import task
+from .counters import recount_counters
+from .images import generate_image_variants
+from .models import Recipe
+from .payloads import refresh_payloads
+from .ranking import update_trending
+from .similarity import update_similar
+
+
+@task('recipes.generate_image_variants')
+def generate_image_variants_task(recipe_id):
+    return generate_image_variants(recipe_id)
+
+
+@task('recipes.recount_counters', max_attempts=1)
+def recount_counters_task():
+    recipes, users = recount_counters(Recipe, get_user_model())
+    return {'recipes': recipes, 'users': users}
+
+
+@task('recipes.refresh_payloads')
+def refresh_payloads_task(recipe_ids=None, **filters):
+    recipes = Recipe.objects.filter(**filters)
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=recipe_ids)
+    updated = refresh_payloads(recipes)
+    response_cache.bump(Recipe)
+    return {'recipes': updated}
+
+
+@task('recipes.update_trending', max_attempts=1)
+def update_trending_task():
+    recipes = update_trending()
+    if recipes:
+        response_cache.bump_scope(TRENDING_SCOPE)
+    return {'recipes': recipes}
+
+
+@task('recipes.update_similar')
+def update_similar_task(changed, affected=()):
+    recipes = update_similar(changed, affected)
+    return {'recipes': recipes}
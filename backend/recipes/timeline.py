@@ -0,0 +1,154 @@
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+
+from .models import Recipe, TimelineEntry
+
+User = get_user_model()
+FANOUT_BATCH_SIZE = 1000
+
+
+def fan_out(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора.
+
+    Рецепты популярных авторов в ленты не раскладываются:
+    они подмешиваются при чтении. Популярность проверяется в том же
+    запросе к подписчикам, а не по recipe.author, который может быть
+    устаревшим объектом.
+    """
+    followers = User.objects.filter(
+        subscribe=recipe.author_id,
+        subscribe__followers_count__lte=settings.FEED_FANOUT_LIMIT,
+    ).values_list('id', flat=True).iterator()
+    batch = list(islice(followers, FANOUT_BATCH_SIZE))
+    while batch:
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    user_id=follower,
+                    recipe_id=recipe.pk,
+                    author_id=recipe.author_id,
+                    pub_date=recipe.pub_date,
+                )
+                for follower in batch
+            ),
+            ignore_conflicts=True,
+        )
+        batch = list(islice(followers, FANOUT_BATCH_SIZE))
+
+
+def backfill(user_ids, author_ids):
+    """Добавляет в ленты последние FEED_BACKFILL_LIMIT рецептов авторов."""
+    authors = User.objects.filter(
+        pk__in=author_ids,
+        followers_count__lte=settings.FEED_FANOUT_LIMIT,
+    ).values_list('id', flat=True)
+    for author in authors:
+        fill(user_ids, author)
+
+
+def fill(user_ids, author):
+    recipes = list(Recipe.objects.filter(author=author).order_by(
+        '-pub_date'
+    ).values_list('id', 'pub_date')[:settings.FEED_BACKFILL_LIMIT])
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user,
+                recipe_id=recipe,
+                author_id=author,
+                pub_date=pub_date,
+            )
+            for user in user_ids
+            for recipe, pub_date in recipes
+        ),
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def restore(author_ids, removed):
+    """Заполняет ленты подписчиков автора, переставшего быть популярным.
+
+    Пока у автора больше FEED_FANOUT_LIMIT подписчиков, его рецепты
+    не раскладываются по лентам, а подмешиваются при чтении. Когда
+    после отписки removed подписчиков он опускается до порога, чтение
+    их больше не подмешивает, поэтому ленты оставшихся подписчиков
+    заполняются здесь. Подписчики считаются по таблице связей:
+    followers_count к этому моменту может быть ещё не обновлён.
+    """
+    subscriptions = User.subscribe.through.objects
+    limit = settings.FEED_FANOUT_LIMIT
+    for author in author_ids:
+        followers = subscriptions.filter(to_foodgramuser=author)
+        remaining = followers.count()
+        if remaining <= limit < remaining + removed:
+            fill(
+                list(followers.values_list('from_foodgramuser', flat=True)),
+                author,
+            )
+
+
+def trim(user_ids=None, author_ids=None):
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(user__in=user_ids)
+    if author_ids is not None:
+        entries = entries.filter(author__in=author_ids)
+    return entries.delete()[0]
+
+
+def feed_keys(user, position, limit):
+    """Ключи (pub_date, id) ленты пользователя, от новых к старым.
+
+    Записи ленты объединяются с рецептами популярных авторов,
+    которые читаются напрямую по индексу (author, -pub_date).
+    """
+    popular = list(user.subscribe.filter(
+        followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).order_by().values_list('id', flat=True))
+    entries = TimelineEntry.objects.filter(user=user).exclude(
+        author__in=popular
+    )
+    if position is not None:
+        pub_date, pk = position
+        entries = entries.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, recipe_id__lt=pk)
+        )
+    keys = list(entries.order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id'
+    )[:limit])
+    if popular:
+        recipes = Recipe.objects.filter(author__in=popular)
+        if position is not None:
+            recipes = recipes.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        keys += recipes.order_by('-pub_date', '-id').values_list(
+            'pub_date', 'id'
+        )[:limit]
+    return sorted(keys, reverse=True)[:limit]
+
+
+def rebuild_timelines(timeline_model, recipe_model, user_model):
+    """Полностью перестраивает ленты по текущим подпискам."""
+    subscriptions = user_model.subscribe.through._meta
+    timeline = timeline_model._meta
+    recipes = recipe_model._meta
+    quote = connection.ops.quote_name
+    timeline_model.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(timeline.db_table)} '
+            f'({quote("user_id")}, {quote("recipe_id")}, '
+            f'{quote("author_id")}, {quote("pub_date")}) '
+            f'SELECT s.{quote("from_foodgramuser_id")}, r.{quote("id")}, '
+            f'r.{quote("author_id")}, r.{quote("pub_date")} '
+            f'FROM {quote(subscriptions.db_table)} s '
+            f'INNER JOIN {quote(recipes.db_table)} r '
+            f'ON r.{quote("author_id")} = s.{quote("to_foodgramuser_id")}'
+        )
+        return cursor.rowcount
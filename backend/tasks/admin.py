@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'updated',)
+    search_fields = ('name',)
+    list_filter = ('status', 'name',)
+    readonly_fields = ('result', 'error', 'created', 'updated',)
@@ -0,0 +1,50 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from tasks.queue import claim, execute_in_thread, prune
+
+PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить все готовые задачи и завершиться',
+        )
+        parser.add_argument(
+            '--prune-days',
+            type=int,
+            help='Раз в час удалять завершённые задачи и файлы '
+                 'результатов старше N дней',
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        pruned_at = None
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while True:
+                if options['prune_days'] is not None and (
+                    pruned_at is None
+                    or time.monotonic() - pruned_at >= PRUNE_INTERVAL
+                ):
+                    tasks, files = prune(options['prune_days'])
+                    pruned_at = time.monotonic()
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Удалено задач: {tasks}, файлов: {files}'
+                    ))
+                tasks = claim(concurrency)
+                if not tasks:
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+                    continue
+                for task in pool.map(execute_in_thread, tasks):
+                    self.stdout.write(f'{task}')
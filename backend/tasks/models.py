@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
+
+User = get_user_model()
+MAX_LEN_CHARFIELD = 200
+
+
+class Task(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        'Задача',
+        max_length=MAX_LEN_CHARFIELD,
+    )
+    args = models.JSONField(
+        'Аргументы',
+        default=list,
+        blank=True,
+    )
+    kwargs = models.JSONField(
+        'Именованные аргументы',
+        default=dict,
+        blank=True,
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    result = models.JSONField(
+        'Результат',
+        null=True,
+        blank=True,
+    )
+    error = models.TextField(
+        'Ошибка',
+        blank=True,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'Попыток',
+        default=0,
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток',
+        default=3,
+    )
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='tasks',
+        verbose_name='Владелец',
+        null=True,
+        blank=True,
+    )
+    run_at = models.DateTimeField(
+        'Запустить после',
+        default=timezone.now,
+    )
+    created = models.DateTimeField(
+        'Создана',
+        auto_now_add=True,
+    )
+    updated = models.DateTimeField(
+        'Обновлена',
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('run_at',)
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at'),
+                name='task_status_run_at_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
@@ -0,0 +1,128 @@
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+from .registry import TASKS
+
+STALLED_ERROR = 'Задача не завершилась за {} с'
+
+
+def enqueue(name, *args, owner=None, run_at=None, **kwargs):
+    """Ставит задачу в очередь.
+
+    Строка задачи создаётся в текущей транзакции и станет видна
+    обработчику только после её фиксации. При TASKS_ALWAYS_EAGER
+    задача выполняется сразу в текущем процессе, run_at игнорируется.
+    """
+    task = Task.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs,
+        owner=owner,
+        max_attempts=TASKS[name].max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+    if settings.TASKS_ALWAYS_EAGER:
+        task.status = Task.RUNNING
+        task.attempts = 1
+        execute(task)
+    return task
+
+
+def claim(batch_size):
+    """Забирает готовые задачи и зависшие задачи с оставшимися попытками.
+
+    Зависшие задачи, исчерпавшие max_attempts, помечаются FAILED.
+    """
+    now = timezone.now()
+    stalled = now - timedelta(seconds=settings.TASKS_RUNNING_TIMEOUT)
+    with transaction.atomic():
+        Task.objects.filter(
+            status=Task.RUNNING,
+            updated__lt=stalled,
+            attempts__gte=F('max_attempts'),
+        ).update(
+            status=Task.FAILED,
+            error=STALLED_ERROR.format(settings.TASKS_RUNNING_TIMEOUT),
+            updated=now,
+        )
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True).filter(
+                Q(status=Task.PENDING, run_at__lte=now)
+                | Q(
+                    status=Task.RUNNING,
+                    updated__lt=stalled,
+                    attempts__lt=F('max_attempts'),
+                )
+            ).order_by('run_at')[:batch_size]
+        )
+        Task.objects.filter(id__in=[task.id for task in tasks]).update(
+            status=Task.RUNNING, attempts=F('attempts') + 1, updated=now
+        )
+    for task in tasks:
+        task.status = Task.RUNNING
+        task.attempts += 1
+    return tasks
+
+
+def execute(task):
+    func = TASKS.get(task.name)
+    try:
+        if func is None:
+            raise LookupError(f'Неизвестная задача: {task.name}')
+        task.result = func(*task.args, **task.kwargs)
+    except Exception:
+        task.error = traceback.format_exc()
+        if func is not None and task.attempts < task.max_attempts:
+            task.status = Task.PENDING
+            task.run_at = timezone.now() + timedelta(
+                seconds=settings.TASKS_RETRY_DELAY * 2 ** (task.attempts - 1)
+            )
+        else:
+            task.status = Task.FAILED
+    else:
+        task.status = Task.DONE
+        task.error = ''
+    task.save(update_fields=(
+        'status', 'result', 'error', 'attempts', 'run_at', 'updated'
+    ))
+    return task
+
+
+def execute_in_thread(task):
+    try:
+        return execute(task)
+    finally:
+        close_old_connections()
+
+
+def prune(days):
+    """Удаляет завершённые задачи и файлы результатов старше days дней.
+
+    Возвращает число удалённых задач и файлов.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    tasks = Task.objects.filter(
+        status__in=(Task.DONE, Task.FAILED), updated__lt=cutoff
+    ).delete()[0]
+    files = 0
+    directories = {
+        func.result_dir for func in TASKS.values() if func.result_dir
+    }
+    for directory in sorted(directories):
+        try:
+            names = default_storage.listdir(directory)[1]
+        except FileNotFoundError:
+            continue
+        for name in names:
+            path = f'{directory}/{name}'
+            if default_storage.get_modified_time(path) < cutoff:
+                default_storage.delete(path)
+                files += 1
+    return tasks, files
@@ -0,0 +1,16 @@
+TASKS = {}
+
+
+def task(name, max_attempts=3, result_dir=None):
+    """Регистрирует функцию как фоновую задачу с именем name.
+
+    result_dir — каталог хранилища, куда задача пишет файлы результата;
+    prune() удаляет из него старые файлы.
+    """
+    def decorator(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        func.result_dir = result_dir
+        TASKS[name] = func
+        return func
+    return decorator
@@ -0,0 +1,14 @@
+from django.urls import include, path
+
+from api import async_views
+
+urlpatterns = [
+    path('api/tags/', async_views.tag_list),
+    path('api/ingredients/', async_views.ingredient_list),
+    path(
+        'api/recipes/download_shopping_cart/',
+        async_views.download_shopping_cart,
+    ),
+    path('api/recipes/<int:pk>/', async_views.recipe_detail),
+    path('api/', include('api.urls', namespace='api')),
+]
@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+
+from asgiref.sync import async_to_sync
+from django.core.files.storage import default_storage
+from django.test import AsyncClient, override_settings
+from rest_framework.authtoken.models import Token
+
+from tasks.models import Task
+from .utils import APITestCase, create_catalog, create_recipes, create_user
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@async_to_sync
+async def get(path, **headers):
+    return await AsyncClient().get(path, **headers)
+
+
+@override_settings(ROOT_URLCONF='tests.async_urls', MEDIA_ROOT=MEDIA_ROOT,
+                   TASKS_ALWAYS_EAGER=True)
+class AsyncViewsTest(APITestCase):
+    """Асинхронные представления ASYNC_READ_VIEWS."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        tags, ingredients = create_catalog(ingredients=10)
+        cls.recipe = create_recipes(
+            create_user('author'), 1, tags, ingredients
+        )[0]
+        cls.reader.carts.add(cls.recipe)
+        cls.token = Token.objects.create(user=cls.reader).key
+        cls.url = f'/api/recipes/{cls.recipe.id}/'
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def authorized(self, path):
+        return get(path, authorization=f'Token {self.token}')
+
+    def test_anonymous_detail_from_cache(self):
+        response = get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            cached = get(self.url)
+            not_modified = get(self.url, **{'if-none-match': cached['ETag']})
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_authorized_detail(self):
+        response = self.authorized(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Cache', response)
+        self.assertIn(b'"is_in_shopping_cart":true', response.content)
+
+    def test_download_shopping_cart(self):
+        response = self.authorized('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertIn('Ингредиент', response.content.decode())
+
+    def test_download_shopping_cart_task(self):
+        response = self.authorized(
+            '/api/recipes/download_shopping_cart/?format=csv&async=1'
+        )
+        self.assertEqual(response.status_code, 202)
+        task = Task.objects.get(owner=self.reader)
+        self.assertEqual(task.status, Task.DONE)
+        path = task.result['url'].replace(default_storage.base_url, '', 1)
+        with default_storage.open(path) as file:
+            self.assertIn('Ингредиент', file.read().decode())
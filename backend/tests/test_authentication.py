@@ -0,0 +1,47 @@
+from django.test import override_settings
+
+from .utils import APITestCase, create_user
+
+ME_URL = '/api/users/me/'
+
+
+class TokenCacheTest(APITestCase):
+    """Кэш токенов не обращается к базе и сбрасывается вовремя."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('reader')
+        self.client = self.client_for(self.user)
+
+    def test_cache_hit_skips_query(self):
+        response, queries = self.count_queries(self.client.get, ME_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(queries, 0)
+        response, queries = self.count_queries(self.client.get, ME_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 0)
+
+    def test_logout(self):
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
+
+    def test_deactivation(self):
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS='default')
+    def test_deactivation_with_shared_cache(self):
+        self.test_deactivation()
+
+    def test_last_login_keeps_cache(self):
+        self.client.get(ME_URL)
+        self.user.save(update_fields=('last_login',))
+        response, queries = self.count_queries(self.client.get, ME_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 0)
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.utils.http import http_date
+
+from recipes.models import Recipe
+from .utils import APITestCase, create_catalog, create_recipes, create_user
+
+
+class ConditionalRequestTest(APITestCase):
+    """ETag, Last-Modified и 304 для рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader = create_user('reader')
+        tags, ingredients = create_catalog(ingredients=10)
+        cls.recipe = create_recipes(cls.author, 1, tags, ingredients)[0]
+        cls.url = f'/api/recipes/{cls.recipe.id}/'
+
+    def test_last_modified(self):
+        response = self.client.get(self.url)
+        last_modified = response['Last-Modified']
+        self.assertEqual(
+            last_modified,
+            http_date(Recipe.objects.get(pk=self.recipe.pk).updated_at
+                      .timestamp()),
+        )
+        self.assertEqual(
+            self.client.get(
+                self.url, HTTP_IF_MODIFIED_SINCE=last_modified
+            ).status_code,
+            304,
+        )
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=self.recipe.updated_at + timedelta(minutes=1)
+        )
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+
+    def test_authenticated_response_has_no_last_modified(self):
+        response = self.client_for(self.reader).get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Authorization', response['Vary'])
+
+    def test_anonymous_response_is_public(self):
+        # nginx кэширует только такие ответы и не хранит ответы
+        # на запросы с Authorization.
+        response = self.client.get(self.url)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('Authorization', response['Vary'])
+
+    def test_etag_depends_on_user(self):
+        reader = self.client_for(self.reader)
+        author = self.client_for(self.author)
+        etags = {
+            self.client.get(self.url)['ETag'],
+            reader.get(self.url)['ETag'],
+            author.get(self.url)['ETag'],
+        }
+        self.assertEqual(len(etags), 3)
+
+    def test_other_user_etag_is_not_reused(self):
+        reader_etag = self.client_for(self.reader).get(self.url)['ETag']
+        response = self.client_for(self.author).get(
+            self.url, HTTP_IF_NONE_MATCH=reader_etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_cart_changes_only_own_etag(self):
+        reader = self.client_for(self.reader)
+        author = self.client_for(self.author)
+        reader_etag = reader.get(self.url)['ETag']
+        author_etag = author.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            reader.post(f'{self.url}shopping_cart/')
+        response = reader.get(self.url, HTTP_IF_NONE_MATCH=reader_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_in_shopping_cart'])
+        self.assertEqual(
+            author.get(self.url, HTTP_IF_NONE_MATCH=author_etag).status_code,
+            304,
+        )
@@ -0,0 +1,87 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from recipes.models import TimelineEntry
+from recipes.timeline import fan_out
+from .utils import (
+    APITestCase,
+    User,
+    create_catalog,
+    create_recipes,
+    create_user
+)
+
+
+class FeedTest(APITestCase):
+    """Лента подписок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader = create_user('reader')
+        cls.tags, cls.ingredients = create_catalog(ingredients=10)
+        cls.reader.subscribe.add(cls.author)
+
+    def test_list_filters_are_ignored(self):
+        recipes = create_recipes(self.author, 3, self.tags, self.ingredients)
+        response = self.client_for(self.reader).get(
+            '/api/recipes/feed/?is_favorited=1&tags=missing'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [recipe.id for recipe in reversed(recipes)],
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_fan_out_reads_followers_count_from_database(self):
+        recipe = create_recipes(
+            self.author, 1, self.tags, self.ingredients
+        )[0]
+        TimelineEntry.objects.all().delete()
+        User.objects.filter(pk=self.author.pk).update(followers_count=1)
+        recipe.author.followers_count = 0
+        fan_out(recipe)
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_author_dropping_under_limit_stays_in_feed(self):
+        other = create_user('other')
+        other.subscribe.add(self.author)
+        recipes = create_recipes(self.author, 2, self.tags, self.ingredients)
+        client = self.client_for(self.reader)
+        expected = [recipe.id for recipe in reversed(recipes)]
+
+        def feed():
+            response = client.get('/api/recipes/feed/')
+            return [recipe['id'] for recipe in response.data['results']]
+
+        self.assertEqual(feed(), expected)
+        other.subscribe.remove(self.author)
+        self.assertEqual(feed(), expected)
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_clear_subscriptions_restores_timelines(self):
+        other = create_user('other')
+        other.subscribe.add(self.author)
+        recipe = create_recipes(self.author, 1, self.tags, self.ingredients)[0]
+        other.subscribe.clear()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, recipe=recipe
+        ).exists())
+
+    def test_generate_dataset_builds_timelines(self):
+        call_command(
+            'generate_dataset',
+            users=5,
+            recipes=20,
+            ingredients=10,
+            subscriptions=2,
+            seed=1,
+            stdout=StringIO(),
+        )
+        self.assertTrue(TimelineEntry.objects.exclude(
+            user=self.reader
+        ).exists())
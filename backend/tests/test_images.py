@@ -0,0 +1,100 @@
+import base64
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from PIL import Image
+
+from recipes.models import Recipe
+from .utils import APITestCase, create_catalog, create_user
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_data(size=(1600, 900), noise=False):
+    buffer = BytesIO()
+    if noise:
+        image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    else:
+        image = Image.new('RGB', size, '#E26C2D')
+    image.save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, TASKS_ALWAYS_EAGER=True)
+class ImageVariantsTest(APITestCase):
+    """Уменьшенные копии изображения рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags, cls.ingredients = create_catalog(ingredients=5)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.author)
+
+    def save(self, method, url, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, {
+                'name': 'Рецепт с фото',
+                'text': 'Описание',
+                'cooking_time': 15,
+                'image': image,
+                'tags': [self.tags[0].id],
+                'ingredients': [{'id': self.ingredients[0].id, 'amount': 1}],
+            }, format='json')
+        self.assertIn(response.status_code, (200, 201), response.data)
+        return Recipe.objects.get(pk=response.data['id'])
+
+    def test_variants(self):
+        recipe = self.save('post', '/api/recipes/', image_data())
+        variants = recipe.image_variants['variants']
+        self.assertEqual(recipe.image_variants['source'], recipe.image.name)
+        self.assertEqual(set(variants), {'thumbnail', 'card', 'full'})
+        for variant, formats in variants.items():
+            self.assertEqual(set(formats), {'webp', 'jpeg'})
+            with default_storage.open(formats['jpeg']) as file:
+                width, _ = Image.open(file).size
+            self.assertEqual(
+                width, {'thumbnail': 320, 'card': 640, 'full': 1280}[variant]
+            )
+        response = self.client.get(f'/api/recipes/{recipe.id}/')
+        self.assertTrue(
+            response.data['image_variants']['thumbnail']['webp'].startswith(
+                'http://testserver/'
+            )
+        )
+
+    def test_replaced_image_variants_are_deleted(self):
+        recipe = self.save('post', '/api/recipes/', image_data())
+        old = recipe.image_variants['variants']['card']['webp']
+        recipe = self.save(
+            'patch', f'/api/recipes/{recipe.id}/', image_data((800, 800))
+        )
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(
+            recipe.image_variants['variants']['card']['webp']
+        ))
+
+    @override_settings(RECIPE_IMAGE_MAX_SIZE=1024)
+    def test_oversized_image_is_rejected(self):
+        response = self.client.post('/api/recipes/', {
+            'name': 'Большое фото',
+            'text': 'Описание',
+            'cooking_time': 15,
+            'image': image_data((64, 64), noise=True),
+            'tags': [self.tags[0].id],
+            'ingredients': [{'id': self.ingredients[0].id, 'amount': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
@@ -0,0 +1,62 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from recipes.models import Recipe
+from .utils import create_catalog, create_recipes, create_user
+
+
+@override_settings(TASKS_ALWAYS_EAGER=True)
+class ImportCatalogTest(TestCase):
+    """--update пересобирает payload рецептов с обновлёнными строками."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags, cls.ingredients = create_catalog(ingredients=10)
+        author = create_user('author')
+        cls.recipe = create_recipes(author, 1, cls.tags, cls.ingredients)[0]
+
+    def import_catalog(self, objects, *options):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.json', encoding='utf-8', delete=False
+        ) as file:
+            json.dump(objects, file, ensure_ascii=False)
+        self.addCleanup(os.remove, file.name)
+        call_command(
+            'import_catalog', file.name, *options,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+    def payload(self):
+        return json.dumps(
+            Recipe.objects.get(pk=self.recipe.pk).payload,
+            ensure_ascii=False,
+        )
+
+    def test_update_refreshes_payloads(self):
+        ingredient = self.ingredients[0]
+        tag = self.tags[0]
+        objects = [
+            {
+                'model': 'recipes.ingredient',
+                'pk': ingredient.pk,
+                'fields': {'name': 'Соль', 'measurement_unit': 'кг'},
+            },
+            {
+                'model': 'recipes.tag',
+                'pk': tag.pk,
+                'fields': {
+                    'name': 'Завтрак', 'slug': tag.slug, 'color': tag.color,
+                },
+            },
+        ]
+        self.import_catalog(objects)
+        self.assertNotIn('Соль', self.payload())
+        self.import_catalog(objects, '--update')
+        payload = self.payload()
+        self.assertIn('Соль', payload)
+        self.assertIn('Завтрак', payload)
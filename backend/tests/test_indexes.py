@@ -0,0 +1,81 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class RecipeIndexesTest(TestCase):
+    """Планы запросов к рецептам используют индексы из миграции 0004.
+
+    Данные генерируются generate_dataset с фиксированным seed. В
+    PostgreSQL последовательное чтение отключается, чтобы на маленькой
+    выборке планировщик выбирал индекс так же, как на большой.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generate_dataset',
+            users=20,
+            recipes=200,
+            ingredients=50,
+            favorites=10,
+            carts=5,
+            subscriptions=3,
+            seed=1,
+            stdout=StringIO(),
+        )
+        cls.user = User.objects.filter(
+            favorites__isnull=False, carts__isnull=False
+        ).first()
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('ANALYZE')
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+    def assert_uses_index(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, plan)
+
+    def test_pub_date_ordering(self):
+        self.assert_uses_index(
+            Recipe.objects.order_by('-pub_date', '-id')[:10],
+            'recipe_pub_date_idx',
+        )
+
+    def test_author_filter(self):
+        self.assert_uses_index(
+            Recipe.objects.filter(author=self.user).order_by('-pub_date'),
+            'recipe_author_pub_date_idx',
+        )
+
+    def test_favorite_lookup(self):
+        self.assert_uses_index(
+            Recipe.objects.filter(favorite=self.user),
+            'recipe_favorite_user_idx',
+        )
+
+    def test_cart_lookup(self):
+        self.assert_uses_index(
+            Recipe.objects.filter(cart=self.user),
+            'recipe_cart_user_idx',
+        )
+
+    def test_tag_filter_without_distinct(self):
+        with self.assertNumQueries(2) as context:
+            response = self.client.get(
+                '/api/recipes/?tags=tag-0&tags=tag-1'
+            )
+        self.assertGreater(response.data['count'], 0)
+        for query in context.captured_queries:
+            self.assertNotIn('DISTINCT', query['sql'])
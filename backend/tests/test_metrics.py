@@ -0,0 +1,47 @@
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+
+from api.metrics import metrics_registry
+from .utils import APITestCase, create_catalog
+
+
+class MetricsMiddlewareTest(APITestCase):
+    """Метрики запроса собираются и в WSGI, и в ASGI."""
+
+    route = 'api:ingredient-detail'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredient = create_catalog(tags=0, ingredients=1)[1][0]
+
+    def setUp(self):
+        super().setUp()
+        metrics_registry._histograms.clear()
+
+    def histogram(self, name):
+        return metrics_registry._histograms[name][(self.route, 'GET')]
+
+    def assert_recorded(self, response, queries):
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(queries, 0)
+        self.assertEqual(self.histogram('request_duration_seconds').count, 1)
+        self.assertEqual(self.histogram('db_queries').sum, queries)
+        self.assertEqual(
+            self.histogram('response_size_bytes').sum, len(response.content)
+        )
+        self.assertEqual(self.histogram('renderer_duration_seconds').count, 1)
+
+    def test_sync(self):
+        response, queries = self.count_queries(
+            self.client.get, f'/api/ingredients/{self.ingredient.id}/'
+        )
+        self.assert_recorded(response, queries)
+
+    def test_async(self):
+        async def get(path):
+            return await AsyncClient().get(path)
+
+        response, queries = self.count_queries(
+            async_to_sync(get), f'/api/ingredients/{self.ingredient.id}/'
+        )
+        self.assert_recorded(response, queries)
@@ -0,0 +1,59 @@
+from recipes.models import Recipe
+from .utils import APITestCase, create_catalog, create_recipes, create_user
+
+
+class PaginationModesTest(APITestCase):
+    """Страницы page/limit и курсорный режим по параметру cursor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.authors = [create_user(f'author-{number}') for number in range(5)]
+        cls.reader.subscribe.add(*cls.authors)
+        tags, ingredients = create_catalog(ingredients=10)
+        create_recipes(cls.authors[0], 5, tags, ingredients)
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.reader)
+
+    def walk(self, url):
+        """Проходит курсорные страницы и возвращает id по порядку."""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_page_number(self):
+        response = self.client.get('/api/recipes/?page=2&limit=2')
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            list(Recipe.objects.values_list('id', flat=True)[2:4]),
+        )
+
+    def test_recipe_cursor(self):
+        self.assertEqual(
+            self.walk('/api/recipes/?cursor=&limit=2'),
+            list(Recipe.objects.values_list('id', flat=True)),
+        )
+
+    def test_cursor_skips_count(self):
+        self.client.get('/api/users/me/')
+        _, page_queries = self.count_queries(
+            self.client.get, '/api/recipes/?limit=2'
+        )
+        _, cursor_queries = self.count_queries(
+            self.client.get, '/api/recipes/?cursor=&limit=2'
+        )
+        self.assertEqual(cursor_queries, page_queries - 1)
+
+    def test_subscriptions_cursor(self):
+        self.assertEqual(
+            self.walk('/api/users/subscriptions/?cursor=&limit=2'),
+            [author.id for author in reversed(self.authors)],
+        )
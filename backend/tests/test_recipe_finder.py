@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from recipes.indexes import RecipeIngredientIndex
+from recipes.models import IngredientInRecipe
+from .utils import create_catalog, create_recipes, create_user
+
+
+class RecipeIngredientIndexTest(TestCase):
+    """Перестройка индекса «что приготовить» не блокирует чтение."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        tags, cls.ingredients = create_catalog(ingredients=10)
+        cls.recipes = create_recipes(
+            author, 3, tags, cls.ingredients, per_recipe=2
+        )
+
+    def setUp(self):
+        self.index = RecipeIngredientIndex()
+
+    def test_stale_index_is_served_during_rebuild(self):
+        first = self.index.find([self.ingredients[0].id], 10)
+        self.index._built_at = 0
+        self.index._build_lock.acquire()
+        try:
+            with self.assertNumQueries(0):
+                self.assertEqual(
+                    self.index.find([self.ingredients[0].id], 10), first
+                )
+        finally:
+            self.index._build_lock.release()
+        with self.assertNumQueries(1):
+            self.index.find([self.ingredients[0].id], 10)
+
+    def test_changes_during_build_are_kept(self):
+        recipe = self.recipes[0]
+        values_list = IngredientInRecipe.objects.values_list
+
+        def snapshot_then_change(*args, **kwargs):
+            # Сборка прочитала связи, после чего рецепт изменили.
+            bindings = list(values_list(*args, **kwargs).order_by())
+            IngredientInRecipe.objects.filter(recipe=recipe).delete()
+            self.index.remove_recipe(recipe.id)
+            return Bindings(bindings)
+
+        with mock.patch.object(
+            IngredientInRecipe.objects, 'values_list', snapshot_then_change
+        ):
+            found = self.index.find([self.ingredients[0].id], 10)
+        self.assertNotIn(recipe.id, [recipe_id for recipe_id, _, _ in found])
+
+    def found(self, index):
+        return [
+            recipe_id
+            for recipe_id, _, _ in index.find([self.ingredients[0].id], 10)
+        ]
+
+    def test_other_process_rebuilds_after_change(self):
+        other = RecipeIngredientIndex()
+        recipe = self.recipes[0]
+        self.assertIn(recipe.id, self.found(self.index))
+        self.assertIn(recipe.id, self.found(other))
+        IngredientInRecipe.objects.filter(recipe=recipe).delete()
+        other.refresh_recipe(recipe.id)
+        with self.assertNumQueries(0):
+            self.assertNotIn(recipe.id, self.found(other))
+        with self.assertNumQueries(1):
+            self.assertNotIn(recipe.id, self.found(self.index))
+
+    def test_refresh_reads_bindings_outside_lock(self):
+        self.found(self.index)
+        bindings = self.index._bindings
+
+        def unlocked(recipe_ids):
+            self.assertFalse(self.index._lock.locked())
+            return bindings(recipe_ids)
+
+        with mock.patch.object(self.index, '_bindings', unlocked):
+            self.index.refresh_recipe(self.recipes[0].id)
+        self.assertIn(self.recipes[0].id, self.found(self.index))
+
+
+class Bindings(list):
+    def order_by(self):
+        return self
+
+    def iterator(self):
+        return iter(self)
@@ -0,0 +1,45 @@
+from recipes.models import Recipe
+from recipes.payloads import refresh_payloads
+from .utils import APITestCase, create_catalog, create_recipes, create_user
+
+LIMITS = (1, 5, 20)
+
+
+class RecipeListQueriesTest(APITestCase):
+    """Число запросов страницы рецептов не зависит от её размера."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader = create_user('reader')
+        tags, ingredients = create_catalog()
+        recipes = create_recipes(cls.author, 25, tags, ingredients)
+        cls.reader.favorites.add(*recipes[::2])
+        cls.reader.carts.add(*recipes[::3])
+        cls.reader.subscribe.add(cls.author)
+        refresh_payloads(Recipe.objects.all())
+
+    def assert_constant_queries(self, budget):
+        client = self.client_for(self.reader)
+        client.get('/api/recipes/')
+        for limit in LIMITS:
+            with self.subTest(limit=limit), self.assertNumQueries(budget):
+                response = client.get(f'/api/recipes/?limit={limit}')
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_payload_page(self):
+        self.assert_constant_queries(2)
+
+    def test_serializer_page_without_payload(self):
+        Recipe.objects.update(payload={})
+        self.assert_constant_queries(5)
+
+    def test_flags_come_from_annotations(self):
+        client = self.client_for(self.reader)
+        response = client.get('/api/recipes/?limit=25')
+        favorited = set(self.reader.favorites.values_list('id', flat=True))
+        for recipe in response.data['results']:
+            self.assertEqual(
+                recipe['is_favorited'], recipe['id'] in favorited
+            )
+            self.assertTrue(recipe['author']['is_subscribed'])
@@ -0,0 +1,94 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.test import override_settings
+from PIL import Image
+
+from recipes.models import IngredientInRecipe, Recipe
+from .utils import APITestCase, create_catalog, create_user
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CREATE_BUDGET = 19
+UPDATE_BUDGET = 20
+
+
+def image_data():
+    buffer = BytesIO()
+    Image.new('RGB', (2, 2)).save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeWriteQueriesTest(APITestCase):
+    """Запись рецепта не делает запросов на каждый ингредиент."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags, cls.ingredients = create_catalog(ingredients=60)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def recipe_data(self, ingredients, amount=10):
+        return {
+            'name': f'Рецепт из {len(ingredients)}',
+            'text': 'Описание',
+            'cooking_time': 15,
+            'image': image_data(),
+            'tags': [tag.id for tag in self.tags[:2]],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient in ingredients
+            ],
+        }
+
+    def create(self, client, ingredients):
+        response, queries = self.count_queries(
+            client.post,
+            '/api/recipes/',
+            self.recipe_data(ingredients),
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id'], queries
+
+    def test_create_budget(self):
+        client = self.client_for(self.author)
+        client.get('/api/users/me/')
+        _, small = self.create(client, self.ingredients[:3])
+        _, large = self.create(client, self.ingredients[3:33])
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, CREATE_BUDGET)
+
+    def test_update_budget(self):
+        client = self.client_for(self.author)
+        client.get('/api/users/me/')
+        counts = []
+        for size in (3, 30):
+            recipe_id, _ = self.create(client, self.ingredients[:size])
+            data = self.recipe_data(
+                self.ingredients[size // 3:size // 3 + size], amount=20
+            )
+            data['name'] = f'Рецепт {size}, новая версия'
+            response, queries = self.count_queries(
+                client.patch,
+                f'/api/recipes/{recipe_id}/',
+                data,
+                format='json',
+            )
+            self.assertEqual(response.status_code, 200, response.data)
+            counts.append(queries)
+            bindings = IngredientInRecipe.objects.filter(recipe_id=recipe_id)
+            self.assertEqual(bindings.count(), size)
+            self.assertEqual(
+                set(bindings.values_list('amount', flat=True)), {20}
+            )
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[1], UPDATE_BUDGET)
+        self.assertEqual(Recipe.objects.count(), 2)
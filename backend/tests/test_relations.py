@@ -0,0 +1,82 @@
+from recipes.models import Recipe
+from .utils import APITestCase, create_catalog, create_recipes, create_user
+
+
+class BulkRelationsTest(APITestCase):
+    """Массовые избранное, корзина и подписки: статусы и счётчики."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        tags, ingredients = create_catalog(ingredients=10)
+        cls.recipes = create_recipes(cls.author, 3, tags, ingredients)
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.user)
+
+    def change(self, method, url, ids):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(
+                url, {'ids': ids}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        return {
+            result['id']: result['status']
+            for result in response.data['results']
+        }
+
+    def counts(self, field):
+        return list(Recipe.objects.order_by('id').values_list(
+            field, flat=True
+        ))
+
+    def test_favorite_bulk(self):
+        first, second, third = (recipe.id for recipe in self.recipes)
+        missing = third + 1
+        self.change('post', '/api/recipes/favorite/', [first])
+        self.assertEqual(
+            self.change('post', '/api/recipes/favorite/',
+                        [first, second, missing, second]),
+            {first: 'exists', second: 'created', missing: 'not_found'},
+        )
+        self.assertEqual(self.counts('favorites_count'), [1, 1, 0])
+        self.assertEqual(
+            self.change('delete', '/api/recipes/favorite/', [second, third]),
+            {second: 'deleted', third: 'absent'},
+        )
+        self.assertEqual(self.counts('favorites_count'), [1, 0, 0])
+
+    def test_shopping_cart_bulk(self):
+        ids = [recipe.id for recipe in self.recipes]
+        self.assertEqual(
+            set(self.change(
+                'post', '/api/recipes/shopping_cart/', ids
+            ).values()),
+            {'created'},
+        )
+        self.assertEqual(self.counts('carts_count'), [1, 1, 1])
+        self.assertEqual(self.user.carts.count(), 3)
+        self.change('delete', '/api/recipes/shopping_cart/', ids[:2])
+        self.assertEqual(self.counts('carts_count'), [0, 0, 1])
+
+    def test_subscribe_bulk(self):
+        other = create_user('other')
+        self.assertEqual(
+            self.change(
+                'post', '/api/users/subscribe/',
+                [self.author.id, other.id],
+            ),
+            {self.author.id: 'created', other.id: 'created'},
+        )
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(
+            self.change('post', '/api/users/subscribe/', [self.author.id]),
+            {self.author.id: 'exists'},
+        )
+        self.change('delete', '/api/users/subscribe/', [self.author.id])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+        self.assertEqual(list(self.user.subscribe.all()), [other])
@@ -0,0 +1,117 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+
+from api.cache import ResponseCache
+from .utils import APITestCase, create_catalog, create_recipes, create_user
+
+
+class FavoriteCacheTest(APITestCase):
+    """Избранное не сбрасывает кэш анонимных ответов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader = create_user('reader')
+        tags, ingredients = create_catalog(ingredients=10)
+        cls.recipe = create_recipes(cls.author, 1, tags, ingredients)[0]
+
+    def toggle(self, client, method):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(client, method)(
+                f'/api/recipes/{self.recipe.id}/favorite/'
+            )
+        self.assertIn(response.status_code, (201, 204))
+
+    def test_anonymous_list_stays_cached(self):
+        self.assertEqual(self.client.get('/api/recipes/')['X-Cache'], 'MISS')
+        reader = self.client_for(self.reader)
+        self.toggle(reader, 'post')
+        self.toggle(reader, 'delete')
+        self.assertEqual(self.client.get('/api/recipes/')['X-Cache'], 'HIT')
+
+    def test_user_etag_changes(self):
+        reader = self.client_for(self.reader)
+        url = f'/api/recipes/{self.recipe.id}/'
+        etag = reader.get(url)['ETag']
+        self.toggle(reader, 'post')
+        response = reader.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_favorited'])
+
+    def test_other_user_etag_changes(self):
+        other = self.client_for(create_user('other'))
+        url = f'/api/recipes/{self.recipe.id}/'
+        etag = other.get(url)['ETag']
+        self.assertEqual(
+            other.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        self.toggle(self.client_for(self.reader), 'post')
+        response = other.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['favorites_count'], 1)
+
+    @mock.patch.object(ResponseCache, 'epoch', return_value=0)
+    def test_anonymous_counters_expire_with_epoch(self, epoch):
+        url = f'/api/recipes/{self.recipe.id}/'
+        etag = self.client.get(url)['ETag']
+        self.toggle(self.client_for(self.reader), 'post')
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        epoch.return_value = 1
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['favorites_count'], 1)
+
+
+class GeneratedDatasetCacheTest(APITestCase):
+    """generate_dataset сбрасывает кэш ответов, хотя не шлёт сигналы."""
+
+    def test_generate_dataset_bumps_versions(self):
+        self.assertEqual(self.client.get('/api/recipes/').data['count'], 0)
+        call_command(
+            'generate_dataset',
+            users=3,
+            recipes=5,
+            ingredients=10,
+            seed=1,
+            stdout=StringIO(),
+        )
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 5)
+
+
+class UserVersionTest(APITestCase):
+    """Версия User сдвигается только при смене полей автора в ответах."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        tags, ingredients = create_catalog(ingredients=10)
+        create_recipes(cls.author, 1, tags, ingredients)
+
+    def assertCache(self, value):
+        self.assertEqual(self.client.get('/api/recipes/')['X-Cache'], value)
+
+    def save(self, **fields):
+        for field, value in fields.items():
+            setattr(self.author, field, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+
+    def test_unrendered_changes_keep_cache(self):
+        self.assertCache('MISS')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_user('newcomer')
+            self.author.save(update_fields=('last_login',))
+        self.save(is_active=False)
+        self.save(is_active=True)
+        self.assertCache('HIT')
+
+    def test_rendered_changes_bump_version(self):
+        self.assertCache('MISS')
+        self.save(first_name='Другое имя')
+        self.assertCache('MISS')
@@ -0,0 +1,51 @@
+from django.db import connection
+
+from recipes.models import Recipe
+from .utils import APITestCase, create_catalog, create_recipes, create_user
+
+
+class RecipeSearchTest(APITestCase):
+    """?search= ранжирует совпадения и сочетается с фильтрами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.tags, ingredients = create_catalog(ingredients=10)
+        recipes = create_recipes(
+            create_user('author'), 4, cls.tags, ingredients
+        )
+        cls.in_text, cls.in_name, cls.other, cls.tagged = recipes
+        names = {
+            cls.in_text: ('Салат', 'Добавьте к салату тыкву.'),
+            cls.in_name: ('Тыквенный суп', 'Описание'),
+            cls.other: ('Омлет', 'Описание'),
+            cls.tagged: ('Тыква с мёдом', 'Описание'),
+        }
+        for recipe, (name, text) in names.items():
+            Recipe.objects.filter(pk=recipe.pk).update(name=name, text=text)
+        cls.tagged.tags.set(cls.tags[2:])
+        Recipe.objects.filter(pk=cls.in_text.pk).update(favorites_count=5)
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_name_matches_rank_first(self):
+        ids = self.ids('/api/recipes/?search=тыкв')
+        self.assertCountEqual(
+            ids, [self.in_name.id, self.tagged.id, self.in_text.id]
+        )
+        if connection.vendor != 'postgresql':
+            self.assertEqual(ids[-1], self.in_text.id)
+
+    def test_search_with_tags(self):
+        self.assertEqual(
+            self.ids(f'/api/recipes/?search=тыкв&tags={self.tags[2].slug}'),
+            [self.tagged.id],
+        )
+
+    def test_search_with_ordering(self):
+        ids = self.ids('/api/recipes/?search=тыкв&ordering=popular')
+        self.assertEqual(ids[0], self.in_text.id)
+        self.assertNotIn(self.other.id, ids)
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from recipes.models import IngredientInRecipe, SimilarRecipe
+from recipes.similarity import (
+    UPDATE_SIMILAR_TASK,
+    build_matrix,
+    rebuild_similar,
+    schedule_update,
+    update_similar
+)
+from tasks.models import Task
+from .utils import APITestCase, create_catalog, create_recipes, create_user
+
+
+class SimilarRecipesTest(APITestCase):
+    """Похожие рецепты: валидация pk, пакетный пересчёт в очереди."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags, cls.ingredients = create_catalog(ingredients=10)
+        cls.recipes = create_recipes(
+            cls.author, 12, cls.tags, cls.ingredients
+        )
+
+    @staticmethod
+    def neighbours():
+        return set(SimilarRecipe.objects.values_list(
+            'recipe_id', 'similar_id'
+        ))
+
+    def test_recipe_created_during_build_is_skipped(self):
+        values_list = IngredientInRecipe.objects.values_list
+        late_author = create_user('late')
+
+        def create_then_read(*args, **kwargs):
+            create_recipes(late_author, 1, self.tags, self.ingredients)
+            return values_list(*args, **kwargs)
+
+        with mock.patch.object(
+            IngredientInRecipe.objects, 'values_list', create_then_read
+        ):
+            recipe_ids, matrix = build_matrix()
+        self.assertEqual(len(recipe_ids), len(self.recipes))
+        self.assertEqual(matrix.shape[0], len(self.recipes))
+
+    def test_non_numeric_pk(self):
+        response = self.client.get('/api/recipes/abc/similar/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_updates_are_merged_into_one_task(self):
+        first, second = self.recipes[:2]
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_update(first.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_update(second.pk, [first.pk])
+        task = Task.objects.get(name=UPDATE_SIMILAR_TASK)
+        self.assertEqual(task.status, Task.PENDING)
+        self.assertEqual(task.args, [[first.pk, second.pk], [first.pk]])
+
+    def test_batch_update_matches_rebuild(self):
+        rebuild_similar()
+        expected = self.neighbours()
+        SimilarRecipe.objects.filter(
+            recipe__in=self.recipes[:3]
+        ).delete()
+        update_similar([recipe.pk for recipe in self.recipes[:3]])
+        self.assertEqual(self.neighbours(), expected)
@@ -0,0 +1,27 @@
+from .utils import APITestCase, create_catalog, create_recipes, create_user
+
+
+class SubscriptionsTest(APITestCase):
+    """Список подписок с ограничением числа рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader = create_user('reader')
+        tags, ingredients = create_catalog(ingredients=10)
+        create_recipes(cls.author, 3, tags, ingredients)
+
+    def test_no_subscriptions_with_recipes_limit(self):
+        response = self.client_for(self.reader).get(
+            '/api/users/subscriptions/?recipes_limit=3'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_recipes_limit(self):
+        self.reader.subscribe.add(self.author)
+        response = self.client_for(self.reader).get(
+            '/api/users/subscriptions/?recipes_limit=2'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results'][0]['recipes']), 2)
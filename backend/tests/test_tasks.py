@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.tasks import SHOPPING_LISTS_DIR
+from tasks.models import Task
+from tasks.queue import claim, prune
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, TASKS_RUNNING_TIMEOUT=60)
+class TaskQueueTest(TestCase):
+    """Очередь: зависшие задачи и очистка завершённых."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @staticmethod
+    def create_task(status, attempts=0, age=timedelta()):
+        task = Task.objects.create(
+            name='recipes.recount_counters',
+            status=status,
+            attempts=attempts,
+            max_attempts=2,
+        )
+        Task.objects.filter(pk=task.pk).update(
+            updated=timezone.now() - age
+        )
+        return task
+
+    def test_stalled_tasks_without_attempts_fail(self):
+        retry = self.create_task(Task.RUNNING, 1, timedelta(minutes=5))
+        exhausted = self.create_task(Task.RUNNING, 2, timedelta(minutes=5))
+        running = self.create_task(Task.RUNNING, 2)
+        self.assertEqual([task.pk for task in claim(10)], [retry.pk])
+        exhausted.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual(exhausted.status, Task.FAILED)
+        self.assertEqual(running.status, Task.RUNNING)
+
+    def test_prune(self):
+        old = self.create_task(Task.DONE, age=timedelta(days=8))
+        failed = self.create_task(Task.FAILED, age=timedelta(days=8))
+        fresh = self.create_task(Task.DONE, age=timedelta(days=1))
+        pending = self.create_task(Task.PENDING, age=timedelta(days=8))
+        directory = os.path.join(MEDIA_ROOT, SHOPPING_LISTS_DIR)
+        os.makedirs(directory, exist_ok=True)
+        for name, days in (('old.txt', 8), ('fresh.txt', 1)):
+            path = os.path.join(directory, name)
+            with open(path, 'w') as file:
+                file.write('Список покупок:')
+            mtime = time.time() - days * 24 * 3600
+            os.utime(path, (mtime, mtime))
+        self.assertEqual(prune(7), (2, 1))
+        self.assertEqual(os.listdir(directory), ['fresh.txt'])
+        self.assertQuerysetEqual(
+            Task.objects.order_by('pk'),
+            [fresh.pk, pending.pk],
+            transform=lambda task: task.pk,
+        )
+        self.assertFalse(Task.objects.filter(pk__in=(old.pk, failed.pk)))
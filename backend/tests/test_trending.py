@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from recipes.models import Recipe, RecipeEvent
+from recipes.ranking import update_trending
+from recipes.tasks import update_trending_task
+from .utils import APITestCase, create_catalog, create_recipes, create_user
+
+
+def add_event(recipe, user, created, delta=1):
+    event = RecipeEvent.objects.create(
+        recipe=recipe, user=user, kind=RecipeEvent.FAVORITE, delta=delta
+    )
+    RecipeEvent.objects.filter(pk=event.pk).update(created=created)
+
+
+def scores():
+    return dict(Recipe.objects.values_list('name', 'trending_score'))
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=24, TRENDING_EVENT_LAG=5,
+                   TRENDING_MIN_SCORE=0.1)
+class UpdateTrendingTest(TestCase):
+    """Затухание рейтинга и учёт новых событий."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        tags, ingredients = create_catalog(ingredients=10)
+        cls.first, cls.second = create_recipes(
+            create_user('author'), 2, tags, ingredients
+        )
+
+    def test_decay_and_new_events(self):
+        now = timezone.now()
+        add_event(self.first, self.user, now - timedelta(hours=24))
+        add_event(self.second, self.user, now - timedelta(seconds=1))
+        self.assertEqual(update_trending(now), 1)
+        self.assertAlmostEqual(scores()[self.first.name], 0.5)
+        self.assertEqual(scores()[self.second.name], 0)
+
+        now += timedelta(hours=24)
+        self.assertEqual(update_trending(now), 1)
+        self.assertAlmostEqual(scores()[self.first.name], 0.25)
+        self.assertAlmostEqual(scores()[self.second.name], 0.5, places=4)
+
+        now += timedelta(hours=1)
+        self.assertEqual(update_trending(now), 0)
+
+        now += timedelta(hours=47)
+        self.assertEqual(update_trending(now), 1)
+        self.assertEqual(scores()[self.first.name], 0)
+        self.assertAlmostEqual(scores()[self.second.name], 0.125, places=4)
+
+
+class TrendingOrderingTest(APITestCase):
+    """ordering=trending и сброс его кэша пересчётом рейтинга."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        tags, ingredients = create_catalog(ingredients=10)
+        cls.recipes = create_recipes(
+            create_user('author'), 3, tags, ingredients
+        )
+
+    def names(self, response):
+        return [recipe['name'] for recipe in response.data['results']]
+
+    def test_trending_ordering(self):
+        old, fresh = timezone.now() - timedelta(hours=1), timezone.now()
+        add_event(self.recipes[0], self.user, old)
+        add_event(self.recipes[0], create_user('other'), old)
+        add_event(self.recipes[2], self.user, old)
+        update_trending(fresh)
+        response = self.client.get('/api/recipes/?ordering=trending')
+        self.assertEqual(self.names(response), [
+            self.recipes[0].name, self.recipes[2].name, self.recipes[1].name,
+        ])
+
+    def test_update_invalidates_only_trending(self):
+        urls = ('/api/recipes/?ordering=trending', '/api/recipes/')
+        for url in urls:
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        update_trending_task()
+        for url in urls:
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        add_event(
+            self.recipes[1], self.user, timezone.now() - timedelta(hours=1)
+        )
+        update_trending_task()
+        response = self.client.get(urls[0])
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.names(response)[0], self.recipes[1].name)
+        self.assertEqual(self.client.get(urls[1])['X-Cache'], 'HIT')
@@ -0,0 +1,37 @@
+from .utils import APITestCase, create_user
+
+LIMITS = (2, 10)
+
+
+class UserListTest(APITestCase):
+    """is_subscribed читается из одного множества подписок на запрос."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.authors = [create_user(f'author-{number}') for number in range(9)]
+        cls.reader.subscribe.add(*cls.authors[::2])
+
+    def test_is_subscribed(self):
+        client = self.client_for(self.reader)
+        response = client.get('/api/users/?limit=10')
+        subscribed = {author.id for author in self.authors[::2]}
+        self.assertEqual(
+            {
+                user['id']: user['is_subscribed']
+                for user in response.data['results']
+            },
+            {
+                user.id: user.id in subscribed
+                for user in [self.reader, *self.authors]
+            },
+        )
+
+    def test_queries_do_not_depend_on_page_size(self):
+        client = self.client_for(self.reader)
+        client.get('/api/users/me/')
+        counts = {
+            self.count_queries(client.get, f'/api/users/?limit={limit}')[1]
+            for limit in LIMITS
+        }
+        self.assertEqual(len(counts), 1)
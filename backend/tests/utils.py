@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+
+User = get_user_model()
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='test-password',
+        first_name='Имя',
+        last_name='Фамилия',
+    )
+
+
+def create_catalog(tags=3, ingredients=40):
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+        for number in range(ingredients)
+    )
+    return (
+        [
+            Tag.objects.create(
+                name=f'Тег {number}', slug=f'tag-{number}', color='#E26C2D'
+            )
+            for number in range(tags)
+        ],
+        list(Ingredient.objects.order_by('id')),
+    )
+
+
+def create_recipes(author, count, tags, ingredients, per_recipe=5):
+    recipes = []
+    for number in range(count):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {author.username} {number}',
+            text='Описание',
+            cooking_time=10,
+        )
+        recipe.tags.set(tags[:2])
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredients=item, amount=10)
+            for item in ingredients[number % 3:number % 3 + per_recipe]
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+class APITestCase(TestCase):
+    """Тесты API со сброшенными кэшами ответов и токенов."""
+
+    def setUp(self):
+        caches['default'].clear()
+        token_cache.clear()
+
+    @staticmethod
+    def client_for(user):
+        client = APIClient()
+        token = Token.objects.get_or_create(user=user)[0]
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    @staticmethod
+    def count_queries(request, *args, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = request(*args, **kwargs)
+        return response, len(context.captured_queries)
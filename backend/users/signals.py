@@ -0,0 +1,33 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from recipes.counters import change_counter
+from .models import FoodgramUser
+
+
+@receiver(m2m_changed, sender=FoodgramUser.subscribe.through)
+def change_followers_count(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            FoodgramUser.objects.filter(pk=instance.pk).update(
+                followers_count=0
+            )
+        else:
+            change_counter(instance.subscribe.all(), 'followers_count', -1)
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    delta = 1 if action == 'post_add' else -1
+    if reverse:
+        change_counter(
+            FoodgramUser.objects.filter(pk=instance.pk),
+            'followers_count',
+            delta * len(pk_set)
+        )
+    else:
+        change_counter(
+            FoodgramUser.objects.filter(pk__in=pk_set),
+            'followers_count',
+            delta
+        )